@@ -0,0 +1,95 @@
+"""Upstream calls made by a thundering herd of identical GETs, with and without coalescing.
+
+    python -m app.bench_coalescing [--requests 1000] [--upstream-delay 100]
+
+Starts a stub upstream (routed as the monopoly service) and the gateway,
+fires all requests for one game state URL at once and counts how many of
+them reached the upstream. The response cache is off, so only coalescing
+can merge requests.
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+import httpx
+from app.bench_proxy import STUB_CALLS_PATH, percentile, start_gateway, start_stub, stop, wait_until_up
+
+STATE_PATH = "/api/v1/monopoly/games/1/state"
+
+
+async def fire(url: str, count: int) -> tuple[list[float], Counter]:
+    latencies = []
+    errors = Counter()
+    limits = httpx.Limits(max_connections=count, max_keepalive_connections=count)
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+        async def send():
+            started = time.perf_counter()
+            try:
+                response = await client.get(url)
+            except httpx.RequestError as e:
+                errors[type(e).__name__] += 1
+                return
+            if response.status_code != 200:
+                errors[response.status_code] += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(send() for _ in range(count)))
+    return latencies, errors
+
+
+async def bench_mode(coalesce: bool, args) -> dict:
+    upstream_url = f"http://127.0.0.1:{args.upstream_port}"
+    upstream = start_stub(args.upstream_port, args.upstream_delay)
+    gateway = start_gateway("pooled", args.gateway_port, {
+        "MONOPOLY_SERVICE_URL": upstream_url,
+        "MONOPOLY_SERVICE_MAX_CONCURRENCY": "100000",
+        # Without coalescing every request needs its own upstream connection
+        "HTTP_MAX_CONNECTIONS": str(args.requests),
+        "CACHE_TTL_MONOPOLY": "0",
+        "COALESCE_REQUESTS": "true" if coalesce else "false",
+    })
+    try:
+        await wait_until_up(f"{upstream_url}/")
+        await wait_until_up(f"http://127.0.0.1:{args.gateway_port}/health")
+        async with httpx.AsyncClient() as client:
+            calls_before = (await client.get(f"{upstream_url}{STUB_CALLS_PATH}")).json()["calls"]
+            latencies, errors = await fire(f"http://127.0.0.1:{args.gateway_port}{STATE_PATH}", args.requests)
+            calls = (await client.get(f"{upstream_url}{STUB_CALLS_PATH}")).json()["calls"] - calls_before
+    finally:
+        stop(gateway)
+        stop(upstream)
+    latencies.sort()
+    return {
+        "mode": "coalesced" if coalesce else "direct",
+        "ok": len(latencies),
+        "errors": dict(errors),
+        "upstream_calls": calls,
+        "p50": percentile(latencies, 0.5) * 1000 if latencies else float("nan"),
+        "p99": percentile(latencies, 0.99) * 1000 if latencies else float("nan"),
+    }
+
+
+async def bench(args):
+    results = [await bench_mode(coalesce, args) for coalesce in (False, True)]
+    print(f"{args.requests} concurrent GET {STATE_PATH}, upstream delay {args.upstream_delay:.0f} ms")
+    print(f"{'mode':<10} {'ok':>6} {'upstream calls':>15} {'p50 ms':>8} {'p99 ms':>8}")
+    for result in results:
+        print(f"{result['mode']:<10} {result['ok']:>6} {result['upstream_calls']:>15} "
+              f"{result['p50']:>8.1f} {result['p99']:>8.1f}  {result['errors'] or ''}")
+    direct, coalesced = results
+    if coalesced["upstream_calls"]:
+        print(f"upstream calls reduced {direct['upstream_calls'] / coalesced['upstream_calls']:.0f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upstream call reduction by request coalescing")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--upstream-delay", type=float, default=100, help="stub upstream latency, ms")
+    parser.add_argument("--gateway-port", type=int, default=18000)
+    parser.add_argument("--upstream-port", type=int, default=18001)
+    asyncio.run(bench(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Gateway latency with pooled upstream clients vs. a new client per request.
+
+    python -m app.bench_proxy [--rate 1000] [--duration 10] [--upstream-delay 0]
+
+Starts a stub upstream and the gateway as separate uvicorn processes, then
+sends GETs through the gateway at a fixed rate and prints p50/p99 latency
+for both modes. The load is open loop: latency is measured from the time a
+request was scheduled, so time spent queueing behind slow requests counts.
+The load generator, gateway and stub share the machine, so 1k rps needs a
+few free cores.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+import httpx
+
+STUB_BODY = json.dumps({"status": "ok"}).encode()
+STUB_CALLS_PATH = "/bench/calls"
+stub_calls = 0
+
+
+async def stub_app(scope, receive, send):
+    """Upstream that answers every request with a small JSON body;
+    STUB_CALLS_PATH returns how many requests it has served"""
+    global stub_calls
+    if scope["type"] != "http":
+        return
+    if scope["path"] == STUB_CALLS_PATH:
+        body = json.dumps({"calls": stub_calls}).encode()
+    else:
+        stub_calls += 1
+        body = STUB_BODY
+        delay = float(os.getenv("BENCH_UPSTREAM_DELAY", "0"))
+        if delay:
+            await asyncio.sleep(delay)
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def start_stub(port: int, delay_ms: float) -> subprocess.Popen:
+    env = {**os.environ, "BENCH_UPSTREAM_DELAY": str(delay_ms / 1000)}
+    return subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "app.bench_proxy:stub_app", "--host", "127.0.0.1",
+        "--port", str(port), "--lifespan", "off", "--log-level", "warning",
+    ], env=env)
+
+
+def start_gateway(mode: str, port: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "app.bench_proxy", "--serve", mode, "--port", str(port)],
+        env={**os.environ, "RATE_LIMIT_ENABLED": "false", "TRACING_ENABLED": "false", **env}
+    )
+
+
+def stop(process: subprocess.Popen):
+    process.terminate()
+    process.wait()
+
+
+def serve_gateway(mode: str, port: int):
+    import uvicorn
+    from app.main import app as gateway
+    if mode == "per-request":
+        from app import routes
+        from app.clients import UpstreamClients
+        from app.config import SERVICE_TIMEOUTS, DEFAULT_SERVICE_TIMEOUT
+
+        class PerRequestClients(UpstreamClients):
+            """The old behaviour: a new client and a new connection for every request"""
+
+            def get(self, service_url: str) -> httpx.AsyncClient:
+                return httpx.AsyncClient(
+                    base_url=service_url,
+                    timeout=SERVICE_TIMEOUTS.get(service_url, DEFAULT_SERVICE_TIMEOUT),
+                    limits=httpx.Limits(max_keepalive_connections=0)
+                )
+
+        routes.upstream_clients = PerRequestClients()
+    uvicorn.run(gateway, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def wait_until_up(url: str, timeout: float = 20):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                await client.get(url)
+                return
+            except httpx.RequestError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.1)
+
+
+async def run_load(url: str, rate: float, duration: float) -> tuple[list[float], Counter]:
+    latencies = []
+    errors = Counter()
+    limits = httpx.Limits(max_connections=2000, max_keepalive_connections=2000)
+    async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+        async def send(scheduled: float):
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            try:
+                response = await client.get(url)
+            except httpx.RequestError as e:
+                errors[type(e).__name__] += 1
+                return
+            if response.status_code != 200:
+                errors[response.status_code] += 1
+                return
+            latencies.append(time.perf_counter() - scheduled)
+
+        started = time.perf_counter() + 0.2
+        await asyncio.gather(*(send(started + index / rate) for index in range(int(rate * duration))))
+    return latencies, errors
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+async def bench_mode(mode: str, args) -> dict:
+    gateway = start_gateway(mode, args.gateway_port, {
+        "DATABASE_INTERFACE_SERVICE_URL": f"http://127.0.0.1:{args.upstream_port}",
+        "DATABASE_INTERFACE_SERVICE_MAX_CONCURRENCY": "100000",
+    })
+    try:
+        base_url = f"http://127.0.0.1:{args.gateway_port}"
+        await wait_until_up(f"{base_url}/health")
+        # The stub is routed as the database interface: that route is neither cached nor coalesced
+        url = f"{base_url}/api/v1/database/health"
+        await run_load(url, args.rate, 1)
+        latencies, errors = await run_load(url, args.rate, args.duration)
+    finally:
+        stop(gateway)
+    latencies.sort()
+    return {
+        "mode": mode,
+        "ok": len(latencies),
+        "errors": sum(errors.values()),
+        "error_kinds": dict(errors),
+        "p50": percentile(latencies, 0.5) * 1000 if latencies else float("nan"),
+        "p99": percentile(latencies, 0.99) * 1000 if latencies else float("nan"),
+    }
+
+
+async def bench(args):
+    upstream = start_stub(args.upstream_port, args.upstream_delay)
+    try:
+        await wait_until_up(f"http://127.0.0.1:{args.upstream_port}/")
+        results = [await bench_mode(mode, args) for mode in ("per-request", "pooled")]
+    finally:
+        stop(upstream)
+
+    print(f"{args.rate:.0f} rps for {args.duration:.0f}s, upstream delay {args.upstream_delay:.0f} ms")
+    print(f"{'mode':<12} {'ok':>7} {'errors':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for result in results:
+        print(f"{result['mode']:<12} {result['ok']:>7} {result['errors']:>7} {result['p50']:>8.2f} {result['p99']:>8.2f}"
+              f"  {result['error_kinds'] or ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gateway p50/p99 with pooled vs. per-request upstream clients")
+    parser.add_argument("--rate", type=float, default=1000)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--upstream-delay", type=float, default=0, help="stub upstream latency, ms")
+    parser.add_argument("--gateway-port", type=int, default=18000)
+    parser.add_argument("--upstream-port", type=int, default=18001)
+    parser.add_argument("--serve", choices=["pooled", "per-request"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve_gateway(args.serve, args.port)
+    else:
+        asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
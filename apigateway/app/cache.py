@@ -0,0 +1,108 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from fastapi import Request
+from fastapi.responses import Response
+from app.config import CACHE_MAX_ENTRIES, CACHE_VARY_HEADERS, CACHE_ROUTES
+
+
+@dataclass
+class CacheEntry:
+    prefix: str
+    expires_at: float
+    status_code: int
+    body: bytes
+    raw_headers: list[tuple[bytes, bytes]]
+
+
+class ResponseCache:
+    """In-memory LRU cache of upstream GET responses with per-route TTL.
+
+    Entries are grouped by route prefix so a mutating request invalidates
+    only its own prefix. A per-prefix generation counter stops a GET that
+    was in flight during the mutation from caching the stale response.
+    """
+
+    def __init__(self, routes: dict[str, float], max_entries: int, vary_headers: list[str]):
+        self.routes = {prefix: ttl for prefix, ttl in routes.items() if ttl > 0}
+        self.max_entries = max_entries
+        self.vary_headers = vary_headers
+        self.entries: OrderedDict[tuple, CacheEntry] = OrderedDict()
+        self.keys_by_prefix: dict[str, set] = {prefix: set() for prefix in self.routes}
+        self.generations: dict[str, int] = {prefix: 0 for prefix in self.routes}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get_prefix(self, path: str) -> str | None:
+        for prefix in self.routes:
+            if path.startswith(prefix):
+                return prefix
+        return None
+
+    def make_key(self, request: Request) -> tuple | None:
+        """Cache key for a cacheable GET, or None if the route is not cached"""
+        if request.method != "GET":
+            return None
+        prefix = self.get_prefix(request.url.path)
+        if prefix is None:
+            return None
+        headers = tuple(request.headers.get(header, "") for header in self.vary_headers)
+        return (prefix, self.generations[prefix], request.url.path, request.url.query, headers)
+
+    def get(self, key: tuple) -> Response | None:
+        entry = self.entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        response = Response(content=entry.body, status_code=entry.status_code)
+        response.raw_headers = list(entry.raw_headers)
+        return response
+
+    def set(self, key: tuple, response: Response):
+        prefix, generation = key[0], key[1]
+        if generation != self.generations[prefix]:
+            return
+        self.entries[key] = CacheEntry(
+            prefix=prefix,
+            expires_at=time.monotonic() + self.routes[prefix],
+            status_code=response.status_code,
+            body=response.body,
+            raw_headers=list(response.raw_headers)
+        )
+        self.entries.move_to_end(key)
+        self.keys_by_prefix[prefix].add(key)
+        while len(self.entries) > self.max_entries:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def invalidate(self, path: str):
+        prefix = self.get_prefix(path)
+        if prefix is None:
+            return
+        self.generations[prefix] += 1
+        for key in list(self.keys_by_prefix[prefix]):
+            self._remove(key)
+        self.invalidations += 1
+
+    def _remove(self, key: tuple):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.keys_by_prefix[entry.prefix].discard(key)
+
+    def get_stats(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
+
+
+response_cache = ResponseCache(CACHE_ROUTES, CACHE_MAX_ENTRIES, CACHE_VARY_HEADERS)
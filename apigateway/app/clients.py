@@ -0,0 +1,93 @@
+import httpx
+from app.config import (
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_CONNECT_TIMEOUT,
+    DEFAULT_SERVICE_TIMEOUT,
+    SERVICE_TIMEOUTS,
+    EVENT_STREAM_MAX_CONNECTIONS,
+    EVENT_STREAM_POOL_TIMEOUT,
+    EVENT_STREAM_READ_TIMEOUT
+)
+
+
+class UpstreamClients:
+    """Keeps one pooled keep-alive AsyncClient per upstream service URL"""
+
+    def __init__(self):
+        self.clients: dict[str, httpx.AsyncClient] = {}
+
+    def _create_client(self, service_url: str) -> httpx.AsyncClient:
+        timeout = SERVICE_TIMEOUTS.get(service_url, DEFAULT_SERVICE_TIMEOUT)
+        return httpx.AsyncClient(
+            base_url=service_url,
+            timeout=httpx.Timeout(timeout, connect=min(timeout, HTTP_CONNECT_TIMEOUT)),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            )
+        )
+
+    async def start(self):
+        for service_url in SERVICE_TIMEOUTS:
+            self.get(service_url)
+
+    def get(self, service_url: str) -> httpx.AsyncClient:
+        client = self.clients.get(service_url)
+        if client is None:
+            client = self.clients[service_url] = self._create_client(service_url)
+        return client
+
+    async def close(self):
+        clients, self.clients = self.clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+class EventStreamClients(UpstreamClients):
+    """Separate pools for long-lived event streams.
+
+    A stream holds its connection until the client goes away, so streams in
+    the regular pool would starve ordinary requests. Here every service gets
+    at most max_streams open streams: acquire() refuses the next one instead
+    of letting it wait for a connection.
+    """
+
+    def __init__(self, max_streams: int = EVENT_STREAM_MAX_CONNECTIONS):
+        super().__init__()
+        self.max_streams = max_streams
+        self.open_streams: dict[str, int] = {}
+        self.rejected = 0
+
+    def _create_client(self, service_url: str) -> httpx.AsyncClient:
+        connect_timeout = min(SERVICE_TIMEOUTS.get(service_url, DEFAULT_SERVICE_TIMEOUT), HTTP_CONNECT_TIMEOUT)
+        return httpx.AsyncClient(
+            base_url=service_url,
+            timeout=httpx.Timeout(
+                EVENT_STREAM_READ_TIMEOUT, connect=connect_timeout, pool=EVENT_STREAM_POOL_TIMEOUT
+            ),
+            limits=httpx.Limits(
+                max_connections=self.max_streams,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            )
+        )
+
+    def acquire(self, service_url: str) -> bool:
+        if self.open_streams.get(service_url, 0) >= self.max_streams:
+            self.rejected += 1
+            return False
+        self.open_streams[service_url] = self.open_streams.get(service_url, 0) + 1
+        return True
+
+    def release(self, service_url: str):
+        self.open_streams[service_url] -= 1
+
+    def get_stats(self) -> dict:
+        return {"max_streams": self.max_streams, "open_streams": self.open_streams, "rejected": self.rejected}
+
+
+upstream_clients = UpstreamClients()
+event_stream_clients = EventStreamClients()
@@ -0,0 +1,69 @@
+import asyncio
+from typing import Awaitable, Callable
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from app.config import CACHE_VARY_HEADERS, COALESCE_ROUTES
+
+
+def clone_response(response: Response) -> Response:
+    cloned = Response(content=response.body, status_code=response.status_code)
+    cloned.raw_headers = list(response.raw_headers)
+    return cloned
+
+
+class RequestCoalescer:
+    """Single-flight for idempotent requests.
+
+    The first request for a key starts the upstream call as a separate task;
+    identical requests arriving while it runs await the same task and get
+    their own copy of its response. The task is shielded, so a leader whose
+    client disconnects does not cancel the call for the others.
+    """
+
+    def __init__(self, vary_headers: list[str], routes: list[str]):
+        self.vary_headers = vary_headers
+        self.routes = routes
+        self.calls: dict[tuple, asyncio.Task] = {}
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+    def make_key(self, service_url: str, path: str, request: Request) -> tuple | None:
+        if request.method != "GET" or "text/event-stream" in request.headers.get("accept", ""):
+            return None
+        if not any(request.url.path.startswith(prefix) for prefix in self.routes):
+            return None
+        headers = tuple(request.headers.get(header, "") for header in self.vary_headers)
+        return (service_url, path, request.url.query, headers)
+
+    async def do(self, key: tuple, call: Callable[[], Awaitable[Response]]) -> Response:
+        task = self.calls.get(key)
+        owner = task is None
+        if owner:
+            self.upstream_calls += 1
+            task = asyncio.ensure_future(call())
+            self.calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+        response = await asyncio.shield(task)
+        if isinstance(response, StreamingResponse):
+            # A stream can be consumed only once, it is never shared
+            return response if owner else await call()
+        return clone_response(response)
+
+    def _finish(self, key: tuple, task: asyncio.Task):
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved if nobody is left to await it
+            task.exception()
+
+    def get_stats(self) -> dict:
+        return {
+            "in_flight": len(self.calls),
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+        }
+
+
+request_coalescer = RequestCoalescer(CACHE_VARY_HEADERS, COALESCE_ROUTES)
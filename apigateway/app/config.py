@@ -10,3 +10,105 @@ MONOPOLY_SERVICE_URL = os.getenv("MONOPOLY_SERVICE_URL", "http://monopoly:8000")
 DATABASE_INTERFACE_SERVICE_URL = os.getenv("DATABASE_INTERFACE_SERVICE_URL", "http://databaseinterface:8000")
 NOTIFICATION_SERVICE_URL = os.getenv("NOTIFICATION_SERVICE_URL", "http://notificationservice:8000")
 
+
+# Game engine shards, in shard index order. Empty means a single GAME_ENGINE_SERVICE_URL
+GAME_ENGINE_SHARD_URLS = [
+    url.strip() for url in os.getenv("GAME_ENGINE_SHARD_URLS", "").split(",") if url.strip()
+]
+# How many users the gateway remembers the game engine shard of; others are looked up on every shard
+USER_SHARD_CACHE_SIZE = int(os.getenv("USER_SHARD_CACHE_SIZE", "100000"))
+
+# Upstream HTTP connection pools
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+
+# Event streams (text/event-stream) use their own pool per service, so open streams can not
+# take the connections of regular requests. Streams past the limit are rejected with 503 at once
+EVENT_STREAM_MAX_CONNECTIONS = int(os.getenv("EVENT_STREAM_MAX_CONNECTIONS", "1000"))
+EVENT_STREAM_POOL_TIMEOUT = float(os.getenv("EVENT_STREAM_POOL_TIMEOUT", "1"))
+# Upstreams send keepalives, so a stream silent for this long is dead
+EVENT_STREAM_READ_TIMEOUT = float(os.getenv("EVENT_STREAM_READ_TIMEOUT", "60"))
+
+# Per-service request timeouts, seconds
+DEFAULT_SERVICE_TIMEOUT = float(os.getenv("DEFAULT_SERVICE_TIMEOUT", "30"))
+SERVICE_TIMEOUTS = {
+    USER_SERVICE_URL: float(os.getenv("USER_SERVICE_TIMEOUT", "10")),
+    GAME_ENGINE_SERVICE_URL: float(os.getenv("GAME_ENGINE_SERVICE_TIMEOUT", "10")),
+    MONOPOLY_SERVICE_URL: float(os.getenv("MONOPOLY_SERVICE_TIMEOUT", "30")),
+    DATABASE_INTERFACE_SERVICE_URL: float(os.getenv("DATABASE_INTERFACE_SERVICE_TIMEOUT", "30")),
+    NOTIFICATION_SERVICE_URL: float(os.getenv("NOTIFICATION_SERVICE_TIMEOUT", "10")),
+}
+for shard_url in GAME_ENGINE_SHARD_URLS:
+    SERVICE_TIMEOUTS.setdefault(shard_url, SERVICE_TIMEOUTS[GAME_ENGINE_SERVICE_URL])
+
+# Per-service limit of concurrent upstream requests; extra requests are rejected with 503
+DEFAULT_SERVICE_MAX_CONCURRENCY = int(os.getenv("DEFAULT_SERVICE_MAX_CONCURRENCY", "100"))
+SERVICE_MAX_CONCURRENCY = {
+    USER_SERVICE_URL: int(os.getenv("USER_SERVICE_MAX_CONCURRENCY", "100")),
+    GAME_ENGINE_SERVICE_URL: int(os.getenv("GAME_ENGINE_SERVICE_MAX_CONCURRENCY", "200")),
+    MONOPOLY_SERVICE_URL: int(os.getenv("MONOPOLY_SERVICE_MAX_CONCURRENCY", "100")),
+    DATABASE_INTERFACE_SERVICE_URL: int(os.getenv("DATABASE_INTERFACE_SERVICE_MAX_CONCURRENCY", "50")),
+    NOTIFICATION_SERVICE_URL: int(os.getenv("NOTIFICATION_SERVICE_MAX_CONCURRENCY", "100")),
+}
+for shard_url in GAME_ENGINE_SHARD_URLS:
+    SERVICE_MAX_CONCURRENCY.setdefault(shard_url, SERVICE_MAX_CONCURRENCY[GAME_ENGINE_SERVICE_URL])
+
+# Circuit breaker: open after N consecutive failures, probe again after the reset timeout
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "10"))
+
+# Retries of idempotent requests. Every request adds RETRY_BUDGET_RATIO to the
+# service's retry budget and every retry spends 1, capped at RETRY_BUDGET_MAX
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "2"))
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MAX = float(os.getenv("RETRY_BUDGET_MAX", "10"))
+RETRY_BACKOFF = float(os.getenv("RETRY_BACKOFF", "0.05"))
+
+# Pass request/response bodies through as byte streams instead of re-encoding JSON
+PROXY_STREAMING = os.getenv("PROXY_STREAMING", "false").lower() == "true"
+
+# Response cache for GET routes: gateway path prefix -> TTL in seconds (0 disables).
+# Any mutating request under a prefix invalidates that prefix
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_VARY_HEADERS = [
+    header.strip().lower()
+    for header in os.getenv("CACHE_VARY_HEADERS", "authorization,accept,accept-encoding").split(",")
+    if header.strip()
+]
+CACHE_ROUTES = {
+    "/api/v1/users/": float(os.getenv("CACHE_TTL_USERS", "5")),
+    "/api/v1/notifications/": float(os.getenv("CACHE_TTL_NOTIFICATIONS", "2")),
+    "/api/v1/monopoly/": float(os.getenv("CACHE_TTL_MONOPOLY", "1")),
+}
+
+# Share one upstream call between identical concurrent GET requests under these
+# gateway path prefixes. Coalesced responses are buffered, so only routes with small,
+# hot responses (players polling game status) are listed
+COALESCE_REQUESTS = os.getenv("COALESCE_REQUESTS", "true").lower() == "true"
+COALESCE_ROUTES = [
+    prefix.strip() for prefix in os.getenv("COALESCE_ROUTES", "/api/v1/monopoly/").split(",") if prefix.strip()
+]
+
+# Rate limiting: token bucket per user (or client IP) and gateway route prefix.
+# Values are (requests per second, burst); prefixes not listed use the default
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # "memory" or "redis"
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://redis:6379/0")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_USER_HEADER = os.getenv("RATE_LIMIT_USER_HEADER", "x-user-id")
+RATE_LIMIT_DEFAULT = (
+    float(os.getenv("RATE_LIMIT_DEFAULT_RATE", "20")),
+    float(os.getenv("RATE_LIMIT_DEFAULT_BURST", "40")),
+)
+RATE_LIMITS = {
+    "/api/v1/game/": (
+        float(os.getenv("RATE_LIMIT_GAME_RATE", "5")),
+        float(os.getenv("RATE_LIMIT_GAME_BURST", "10")),
+    ),
+}
+
+# Tracing: spans are written as JSON lines to TRACING_FILE, or to stdout if it is empty
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+TRACING_FILE = os.getenv("TRACING_FILE", "")
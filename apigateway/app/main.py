@@ -1,8 +1,15 @@
 from fastapi import FastAPI, Request
+from prometheus_fastapi_instrumentator import Instrumentator
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import httpx
 from app.routes import router
+from app.clients import upstream_clients, event_stream_clients
+from app.cache import response_cache
+from app.coalescing import request_coalescer
+from app.resilience import upstream_guards
+from app.sharding import user_shards
+from app.tracing import setup_tracing
 
 app = FastAPI(
     title="API Gateway",
@@ -10,6 +17,13 @@ app = FastAPI(
     description="API Gateway for routing requests to microservices"
 )
 
+# Prometheus metrics: per-route counts, latency histograms and in-flight gauge at /metrics
+Instrumentator(
+    should_instrument_requests_inprogress=True,
+    inprogress_labels=True,
+    excluded_handlers=["/metrics"]
+).instrument(app).expose(app, include_in_schema=False)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -19,13 +33,56 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if setup_tracing("apigateway"):
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+    from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+
+    # Server spans for gateway handlers, client spans for upstream calls;
+    # both propagate the W3C traceparent header
+    FastAPIInstrumentor.instrument_app(app, excluded_urls="health,metrics")
+    HTTPXClientInstrumentor().instrument()
+
 app.include_router(router)
 
+@app.on_event("startup")
+async def startup_event():
+    await upstream_clients.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await upstream_clients.close()
+    await event_stream_clients.close()
+
 @app.get("/health")
 async def health_check():
     """Health check for API Gateway"""
     return {"status": "ok", "service": "apigateway"}
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Response cache hit/miss counters"""
+    return response_cache.get_stats()
+
+@app.get("/coalescing/stats")
+async def coalescing_stats():
+    """Upstream calls made vs. requests served by an in-flight call"""
+    return request_coalescer.get_stats()
+
+@app.get("/upstreams/stats")
+async def upstreams_stats():
+    """Circuit breaker state, concurrency and retries per upstream"""
+    return upstream_guards.get_stats()
+
+@app.get("/streams/stats")
+async def streams_stats():
+    """Open and rejected event streams per upstream"""
+    return event_stream_clients.get_stats()
+
+@app.get("/sharding/stats")
+async def sharding_stats():
+    """Users with a known game engine shard and shard lookups made"""
+    return user_shards.get_stats()
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler"""
@@ -0,0 +1,9 @@
+from prometheus_client import Histogram
+
+# Time from sending the upstream request to receiving its response headers
+UPSTREAM_LATENCY = Histogram(
+    "gateway_upstream_request_duration_seconds",
+    "Latency of requests proxied to upstream services",
+    ["upstream", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
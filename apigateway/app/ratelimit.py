@@ -0,0 +1,145 @@
+import json
+import logging
+import math
+import time
+from collections import OrderedDict
+from fastapi import HTTPException, Request
+from app.config import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_REDIS_URL,
+    RATE_LIMIT_MAX_KEYS,
+    RATE_LIMIT_USER_HEADER,
+    RATE_LIMIT_DEFAULT,
+    RATE_LIMITS
+)
+
+logger = logging.getLogger(__name__)
+
+# Bodies larger than this are not parsed to look for a user_id
+MAX_BODY_SCAN_SIZE = 64 * 1024
+
+
+class RateLimitBackend:
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        """Take one token; returns 0 if allowed, otherwise seconds until a token is available"""
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Token buckets in a bounded LRU dict, local to this gateway replica"""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.buckets: OrderedDict[str, list[float]] = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [burst, now]
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Token buckets shared by all gateway replicas, updated atomically by a Lua script"""
+
+    SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local time = redis.call('TIME')
+    local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or burst
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + (now - ts) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self.client = redis.from_url(url)
+        self.script = self.client.register_script(self.SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        try:
+            return float(await self.script(keys=[f"ratelimit:{key}"], args=[rate, burst]))
+        except Exception as e:
+            # Fail open: a broken limiter must not take the gateway down
+            logger.warning(f"Rate limit backend error: {e}")
+            return 0.0
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend, limits: dict[str, tuple[float, float]],
+                 default: tuple[float, float], user_header: str):
+        self.backend = backend
+        self.limits = limits
+        self.default = default
+        self.user_header = user_header
+
+    def get_limit(self, path: str) -> tuple[str, float, float]:
+        for prefix, (rate, burst) in self.limits.items():
+            if path.startswith(prefix):
+                return prefix, rate, burst
+        # Unlisted routes share a bucket per /api/v1/<service>/ prefix
+        prefix = "/".join(path.split("/")[:4]) + "/"
+        return prefix, self.default[0], self.default[1]
+
+    async def get_client_id(self, request: Request) -> str:
+        user_id = request.headers.get(self.user_header) or request.query_params.get("user_id")
+        if user_id is None and request.method in ["POST", "PUT", "PATCH"]:
+            content_length = request.headers.get("content-length")
+            if content_length is not None and content_length.isdigit() and int(content_length) <= MAX_BODY_SCAN_SIZE:
+                try:
+                    payload = json.loads(await request.body())
+                    if isinstance(payload, dict):
+                        user_id = payload.get("user_id")
+                except ValueError:
+                    pass
+        if user_id is not None:
+            return f"user:{user_id}"
+        return f"ip:{request.client.host if request.client else 'unknown'}"
+
+    async def check(self, request: Request):
+        prefix, rate, burst = self.get_limit(request.url.path)
+        client_id = await self.get_client_id(request)
+        wait = await self.backend.take(f"{prefix}:{client_id}", rate, burst)
+        if wait > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests",
+                headers={
+                    "Retry-After": str(math.ceil(wait)),
+                    "X-RateLimit-Limit": str(int(burst)),
+                    "X-RateLimit-Remaining": "0",
+                }
+            )
+
+
+def create_backend(kind: str = RATE_LIMIT_BACKEND) -> RateLimitBackend:
+    if kind == "redis":
+        return RedisRateLimitBackend(RATE_LIMIT_REDIS_URL)
+    if kind == "memory":
+        return MemoryRateLimitBackend(RATE_LIMIT_MAX_KEYS)
+    raise ValueError(f"Unknown rate limit backend: {kind}")
+
+
+rate_limiter = RateLimiter(create_backend(), RATE_LIMITS, RATE_LIMIT_DEFAULT, RATE_LIMIT_USER_HEADER) if RATE_LIMIT_ENABLED else None
@@ -0,0 +1,167 @@
+import asyncio
+import time
+from typing import Awaitable, Callable
+import httpx
+from fastapi import HTTPException
+from fastapi.responses import Response, StreamingResponse
+from app.config import (
+    DEFAULT_SERVICE_MAX_CONCURRENCY,
+    SERVICE_MAX_CONCURRENCY,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_BUDGET_RATIO,
+    RETRY_BUDGET_MAX,
+    RETRY_BACKOFF
+)
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open single probe"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self.probe_in_flight:
+                return False
+            self.probe_in_flight = True
+        return True
+
+    def retry_after(self) -> int:
+        return max(1, int(self.reset_timeout - (time.monotonic() - self.opened_at)))
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """Retries are allowed only while they stay a fraction of the traffic"""
+
+    def __init__(self, ratio: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class UpstreamGuard:
+    """Circuit breaker, bounded concurrency and budgeted retries for one upstream"""
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+        self.retry_budget = RetryBudget(RETRY_BUDGET_RATIO, RETRY_BUDGET_MAX)
+        self.rejected = 0
+        self.retries = 0
+
+    async def call(self, send: Callable[[], Awaitable[Response]], retryable: bool) -> Response:
+        if self.in_flight >= self.max_concurrency:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Service overloaded", headers={"Retry-After": "1"})
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Service unavailable: circuit open",
+                headers={"Retry-After": str(self.breaker.retry_after())}
+            )
+
+        is_probe = self.breaker.state == CircuitBreaker.HALF_OPEN
+        self.in_flight += 1
+        self.retry_budget.deposit()
+        try:
+            attempt = 0
+            while True:
+                try:
+                    response = await send()
+                except httpx.RequestError:
+                    self.breaker.record_failure()
+                    if not await self._should_retry(retryable, attempt):
+                        raise
+                    attempt += 1
+                    continue
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    self.breaker.record_success()
+                    return response
+                self.breaker.record_failure()
+                # A stream can not be replayed after it was handed out
+                if isinstance(response, StreamingResponse) or not await self._should_retry(retryable, attempt):
+                    return response
+                attempt += 1
+        finally:
+            self.in_flight -= 1
+            if is_probe:
+                # A cancelled probe must not keep the breaker half-open forever
+                self.breaker.probe_in_flight = False
+
+    async def _should_retry(self, retryable: bool, attempt: int) -> bool:
+        if not retryable or attempt >= RETRY_MAX_ATTEMPTS or not self.breaker.allow():
+            return False
+        if not self.retry_budget.withdraw():
+            return False
+        self.retries += 1
+        await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+        return True
+
+    def get_stats(self) -> dict:
+        return {
+            "state": self.breaker.state,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "retries": self.retries,
+            "retry_budget": round(self.retry_budget.tokens, 2),
+        }
+
+
+class UpstreamGuards:
+    def __init__(self):
+        self.guards: dict[str, UpstreamGuard] = {}
+
+    def get(self, service_url: str) -> UpstreamGuard:
+        guard = self.guards.get(service_url)
+        if guard is None:
+            max_concurrency = SERVICE_MAX_CONCURRENCY.get(service_url, DEFAULT_SERVICE_MAX_CONCURRENCY)
+            guard = self.guards[service_url] = UpstreamGuard(max_concurrency)
+        return guard
+
+    def get_stats(self) -> dict:
+        return {service_url: guard.get_stats() for service_url, guard in self.guards.items()}
+
+
+upstream_guards = UpstreamGuards()
@@ -1,47 +1,358 @@
 from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+import asyncio
+import json
+import time
 import httpx
 from app.config import (
     USER_SERVICE_URL,
-    GAME_ENGINE_SERVICE_URL,
     MONOPOLY_SERVICE_URL,
     DATABASE_INTERFACE_SERVICE_URL,
-    NOTIFICATION_SERVICE_URL
+    NOTIFICATION_SERVICE_URL,
+    PROXY_STREAMING,
+    COALESCE_REQUESTS
 )
+from app.sharding import game_engine_routing, user_shards, USER_OPERATIONS, EVENTS_PATH
+from app.clients import upstream_clients, event_stream_clients
+from app.cache import response_cache
+from app.coalescing import request_coalescer
+from app.resilience import upstream_guards, IDEMPOTENT_METHODS
+from app.ratelimit import rate_limiter, MAX_BODY_SCAN_SIZE
+from app.metrics import UPSTREAM_LATENCY
 
 router = APIRouter()
 
+# Connection-level headers that must not be forwarded by a proxy
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+    "host",
+}
+
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+def forward_headers(headers: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    return [(name, value) for name, value in headers if name.lower() not in HOP_BY_HOP_HEADERS]
+
+def forward_raw_headers(response: httpx.Response) -> list[tuple[bytes, bytes]]:
+    return [
+        (name.encode("latin-1"), value.encode("latin-1"))
+        for name, value in forward_headers(response.headers.multi_items())
+    ]
+
+class ClosingStreamingResponse(StreamingResponse):
+    """StreamingResponse that always runs on_close, also when the client
+    disconnects before the body starts (Starlette skips background tasks then)"""
+
+    def __init__(self, content, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.on_close()
+
+def streaming_response(response: httpx.Response, on_close=None) -> StreamingResponse:
+    """Pass the upstream response through as raw bytes, without decoding"""
+    async def close():
+        await response.aclose()
+        if on_close is not None:
+            on_close()
+
+    streaming = ClosingStreamingResponse(response.aiter_raw(), close, status_code=response.status_code)
+    streaming.raw_headers = forward_raw_headers(response)
+    return streaming
+
+def is_event_stream(request: Request) -> bool:
+    return request.method == "GET" and "text/event-stream" in request.headers.get("accept", "")
+
+async def proxy_event_stream(service_url: str, path: str, request: Request):
+    """Proxy a long-lived event stream over the separate stream pool.
+
+    Streams bypass the cache, coalescing and the upstream guard: a guard
+    only counts a request until its headers arrive, and one stream would
+    hold a regular pooled connection for as long as the client listens.
+    """
+    if rate_limiter is not None:
+        await rate_limiter.check(request)
+    if not event_stream_clients.acquire(service_url):
+        raise HTTPException(status_code=503, detail="Too many open event streams", headers={"Retry-After": "1"})
+    client = event_stream_clients.get(service_url)
+    upstream_request = client.build_request(
+        method="GET",
+        url=path,
+        params=dict(request.query_params),
+        headers=forward_headers(request.headers.items())
+    )
+    started = time.perf_counter()
+    try:
+        response = await client.send(upstream_request, stream=True)
+    except httpx.RequestError as e:
+        event_stream_clients.release(service_url)
+        UPSTREAM_LATENCY.labels(service_url, "GET", "error").observe(time.perf_counter() - started)
+        raise HTTPException(status_code=503, detail=f"Service unavailable: {str(e)}")
+    except BaseException:
+        event_stream_clients.release(service_url)
+        raise
+    UPSTREAM_LATENCY.labels(service_url, "GET", str(response.status_code)).observe(time.perf_counter() - started)
+    return streaming_response(response, on_close=lambda: event_stream_clients.release(service_url))
+
 async def proxy_request(service_url: str, path: str, method: str, request: Request):
     """Proxy request to a microservice"""
-    url = f"{service_url}{path}"
-    
+    if is_event_stream(request):
+        return await proxy_event_stream(service_url, path, request)
+    if rate_limiter is not None:
+        await rate_limiter.check(request)
+
+    cache_key = response_cache.make_key(request)
+    if cache_key is not None:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    guard = upstream_guards.get(service_url)
+    # A streamed request body can not be sent twice
+    retryable = method in IDEMPOTENT_METHODS and not (PROXY_STREAMING and method in ["POST", "PUT", "PATCH"])
+    coalesce_key = request_coalescer.make_key(service_url, path, request) if COALESCE_REQUESTS else None
+    try:
+        if coalesce_key is not None:
+            response = await request_coalescer.do(
+                coalesce_key,
+                lambda: guard.call(
+                    lambda: forward_request(service_url, path, method, request, buffered=True),
+                    retryable
+                )
+            )
+        else:
+            response = await guard.call(
+                lambda: forward_request(service_url, path, method, request, buffered=cache_key is not None),
+                retryable
+            )
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=503, detail=f"Service unavailable: {str(e)}")
+    finally:
+        if method in MUTATING_METHODS:
+            response_cache.invalidate(request.url.path)
+
+    if cache_key is not None and response.status_code == 200 and not isinstance(response, StreamingResponse):
+        response_cache.set(cache_key, response)
+    return response
+
+async def forward_request(service_url: str, path: str, method: str, request: Request, buffered: bool = False):
+    """Send the request upstream; buffered responses are read fully even in streaming mode.
+
+    Raises httpx.RequestError so the caller can retry.
+    """
+    client = upstream_clients.get(service_url)
+
     # Get request body if exists
     body = None
     if request.method in ["POST", "PUT", "PATCH"]:
-        try:
-            body = await request.body()
-        except:
-            pass
+        if PROXY_STREAMING:
+            body = request.stream()
+        else:
+            try:
+                body = await request.body()
+            except:
+                pass
     
     # Get query parameters
     params = dict(request.query_params)
     
-    async with httpx.AsyncClient() as client:
+    upstream_request = client.build_request(
+        method=method,
+        url=path,
+        content=body,
+        params=params,
+        headers=dict(request.headers) if not PROXY_STREAMING else forward_headers(request.headers.items())
+    )
+    started = time.perf_counter()
+    try:
+        response = await client.send(upstream_request, stream=True)
+    except httpx.RequestError:
+        UPSTREAM_LATENCY.labels(service_url, method, "error").observe(time.perf_counter() - started)
+        raise
+    UPSTREAM_LATENCY.labels(service_url, method, str(response.status_code)).observe(time.perf_counter() - started)
+
+    content_type = response.headers.get("content-type", "")
+    if content_type.startswith("text/event-stream") or (PROXY_STREAMING and not buffered):
+        return streaming_response(response)
+
+    try:
+        if PROXY_STREAMING:
+            content = b"".join([chunk async for chunk in response.aiter_raw()])
+        else:
+            await response.aread()
+    finally:
+        await response.aclose()
+    if PROXY_STREAMING:
+        buffered_response = Response(content=content, status_code=response.status_code)
+        buffered_response.raw_headers = forward_raw_headers(response)
+        return buffered_response
+    return JSONResponse(
+        content=response.json() if content_type.startswith("application/json") else {"data": response.text},
+        status_code=response.status_code
+    )
+
+async def send_batch_to_shard(shard: int, operations: list) -> tuple[int, list[dict] | None, str]:
+    """POST a sub-batch to one shard; returns (status code, results or None, error detail)"""
+    service_url = game_engine_routing.shard_urls[shard]
+    client = upstream_clients.get(service_url)
+
+    async def send():
+        started = time.perf_counter()
         try:
-            response = await client.request(
-                method=method,
-                url=url,
-                content=body,
-                params=params,
-                headers=dict(request.headers),
-                timeout=30.0
-            )
-            return JSONResponse(
-                content=response.json() if response.headers.get("content-type", "").startswith("application/json") else {"data": response.text},
-                status_code=response.status_code
+            response = await client.post("/api/v1/batch/", json={"operations": operations})
+        except httpx.RequestError:
+            UPSTREAM_LATENCY.labels(service_url, "POST", "error").observe(time.perf_counter() - started)
+            raise
+        UPSTREAM_LATENCY.labels(service_url, "POST", str(response.status_code)).observe(time.perf_counter() - started)
+        return response
+
+    try:
+        response = await upstream_guards.get(service_url).call(send, retryable=False)
+    except httpx.RequestError as e:
+        return 503, None, f"Service unavailable: {str(e)}"
+    except HTTPException as e:
+        return e.status_code, None, e.detail
+    if response.status_code != 200:
+        return response.status_code, None, response.text
+    return 200, response.json(), ""
+
+def parse_int(value) -> int | None:
+    """Integer the way the game engine's models accept it, e.g. 42 or "42" """
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return None
+    return None
+
+def check_operation(operation) -> str | None:
+    """Why a batch operation is invalid, or None; user_id and invite_code are
+    normalized in place, since the gateway routes by them before the shard validates"""
+    if not isinstance(operation, dict) or operation.get("op") not in USER_OPERATIONS:
+        return "op must be one of create, join, leave, start"
+    operation["user_id"] = parse_int(operation.get("user_id"))
+    if operation["user_id"] is None:
+        return "user_id must be an integer"
+    if operation["op"] == "create" and not isinstance(operation.get("game"), str):
+        return "game is required for create"
+    if operation["op"] == "join":
+        operation["invite_code"] = parse_int(operation.get("invite_code"))
+        if operation["invite_code"] is None:
+            return "invite_code is required for join"
+    return None
+
+async def run_batch_round(operations: list, positions: list[int], results: list):
+    """Send one round of operations, at most one per user, to the shards of their users"""
+    groups = {}
+    for position in positions:
+        operation = operations[position]
+        shard = await user_shards.route(operation["op"], operation["user_id"], operation.get("invite_code"))
+        if shard is None:
+            results[position] = {"status_code": 406, "detail": "User is already in a game on another shard"}
+        else:
+            groups.setdefault(shard, []).append(position)
+
+    replies = await asyncio.gather(*(
+        send_batch_to_shard(shard, [operations[position] for position in group])
+        for shard, group in groups.items()
+    ))
+    for (shard, group), (status_code, shard_results, detail) in zip(groups.items(), replies):
+        for index, position in enumerate(group):
+            if shard_results is not None:
+                results[position] = shard_results[index]
+            else:
+                results[position] = {"status_code": status_code, "detail": detail}
+            operation = operations[position]
+            user_shards.record(operation["user_id"], operation["op"], shard, results[position]["status_code"])
+
+async def proxy_game_engine_batch(request: Request):
+    """Run a /batch/ request against the shards holding each user and merge
+    the per-operation results back in the original order.
+
+    Where a user's next operation goes depends on the result of the
+    previous one, so the batch runs in rounds with one operation per user.
+    """
+    if rate_limiter is not None:
+        await rate_limiter.check(request)
+    try:
+        operations = json.loads(await request.body())["operations"]
+        if not isinstance(operations, list):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=422, detail="Invalid batch request")
+
+    results = [None] * len(operations)
+    pending = []
+    for position, operation in enumerate(operations):
+        error = check_operation(operation)
+        if error is not None:
+            results[position] = {"status_code": 422, "detail": error}
+        else:
+            pending.append(position)
+
+    user_ids = [operations[position]["user_id"] for position in pending]
+    try:
+        async with user_shards.locked(user_ids):
+            await user_shards.prefetch(user_ids)
+            while pending:
+                # A round ends before the first repeated user, which keeps the
+                # order of operations within each shard
+                round_users = set()
+                size = 0
+                while size < len(pending) and operations[pending[size]]["user_id"] not in round_users:
+                    round_users.add(operations[pending[size]]["user_id"])
+                    size += 1
+                await run_batch_round(operations, pending[:size], results)
+                pending = pending[size:]
+    finally:
+        response_cache.invalidate(request.url.path)
+    return JSONResponse(content=results)
+
+async def proxy_game_engine_user_operation(operation: str, path: str, request: Request):
+    """Proxy create/join/start to the shard holding the user's game"""
+    # Only small bodies are read; the user id decides the shard, so a request
+    # without one can not be proxied
+    content_length = request.headers.get("content-length")
+    if content_length is None or not content_length.isdigit():
+        raise HTTPException(status_code=411, detail="Content-Length is required")
+    if int(content_length) > MAX_BODY_SCAN_SIZE:
+        raise HTTPException(status_code=413, detail="Request body is too large")
+    try:
+        payload = json.loads(await request.body())
+    except ValueError:
+        payload = None
+    user_id = parse_int(payload.get("user_id")) if isinstance(payload, dict) else None
+    if user_id is None:
+        raise HTTPException(status_code=422, detail="user_id must be an integer")
+    invite_code = parse_int(payload.get("invite_code"))
+    async with user_shards.locked([user_id]):
+        shard = await user_shards.route(operation, user_id, invite_code)
+        if shard is None:
+            raise HTTPException(status_code=406, detail="User is already in a game on another shard")
+        try:
+            response = await proxy_request(
+                game_engine_routing.shard_urls[shard], f"/api/v1/{path}", request.method, request
             )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"Service unavailable: {str(e)}")
+        except HTTPException as e:
+            user_shards.record(user_id, operation, shard, e.status_code)
+            raise
+        user_shards.record(user_id, operation, shard, response.status_code)
+        return response
 
 # User Service Routes
 @router.api_route("/api/v1/users/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
@@ -51,7 +362,17 @@ async def proxy_users(path: str, request: Request):
 # Game Engine Routes
 @router.api_route("/api/v1/game/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
 async def proxy_game_engine(path: str, request: Request):
-    return await proxy_request(GAME_ENGINE_SERVICE_URL, f"/api/v1/{path}", request.method, request)
+    if EVENTS_PATH.match(path) and request.method == "GET":
+        return await proxy_event_stream(game_engine_routing.get_url(path), f"/api/v1/{path}", request)
+    # A single shard needs no routing, so its request bodies stay streamed end to end
+    if game_engine_routing.shard_count == 1:
+        return await proxy_request(game_engine_routing.shard_urls[0], f"/api/v1/{path}", request.method, request)
+    operation = path.strip("/")
+    if operation == "batch" and request.method == "POST":
+        return await proxy_game_engine_batch(request)
+    if operation in USER_OPERATIONS and request.method == "POST":
+        return await proxy_game_engine_user_operation(operation, path, request)
+    return await proxy_request(game_engine_routing.get_url(path), f"/api/v1/{path}", request.method, request)
 
 # Monopoly Service Routes
 @router.api_route("/api/v1/monopoly/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
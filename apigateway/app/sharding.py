@@ -0,0 +1,166 @@
+import asyncio
+import re
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+import httpx
+from fastapi import HTTPException
+from app.config import GAME_ENGINE_SERVICE_URL, GAME_ENGINE_SHARD_URLS, USER_SHARD_CACHE_SIZE
+from app.clients import upstream_clients
+from app.resilience import upstream_guards
+
+# Must match gameengine's invite code space (app/GamesEngine/invite_codes.py)
+MIN_INVITE_CODE = 100000
+MAX_INVITE_CODE = 999999
+
+# Lobby event streams carry the invite code in the path: events/{invite_code}/
+EVENTS_PATH = re.compile(r"^events/(\d+)/?$")
+
+# Game engine operations that act on the game of the user in the payload
+USER_OPERATIONS = {"create", "join", "leave", "start"}
+
+
+class GameEngineRoutingTable:
+    """Maps game engine shards to invite codes and users.
+
+    Each shard hands out invite codes from its own contiguous range, so a
+    game is found by its invite code. A user without a game creates one on
+    their home shard (user id modulo shard count).
+    """
+
+    def __init__(self, shard_urls: list[str]):
+        self.shard_urls = shard_urls
+        self.shard_count = len(shard_urls)
+        self.codes_per_shard = (MAX_INVITE_CODE - MIN_INVITE_CODE + 1) // self.shard_count
+
+    def shard_for_invite_code(self, invite_code: int) -> int:
+        shard = (invite_code - MIN_INVITE_CODE) // self.codes_per_shard
+        return min(max(shard, 0), self.shard_count - 1)
+
+    def shard_for_user_id(self, user_id: int) -> int:
+        return user_id % self.shard_count
+
+    def get_url(self, path: str) -> str:
+        """Shard URL for requests that are not user operations"""
+        events = EVENTS_PATH.match(path)
+        if events is not None:
+            return self.shard_urls[self.shard_for_invite_code(int(events.group(1)))]
+        return self.shard_urls[0]
+
+
+class UserShardDirectory:
+    """Remembers which shard holds the game of each user.
+
+    Every operation of a user must reach the shard of their current game,
+    otherwise each shard checks "one game per user" on its own and a user
+    can end up in games on two shards. Unknown users are looked up on all
+    shards, and the directory is updated from the results of the proxied
+    operations. Operations of one user are serialized with a per-user lock,
+    so the entry can not change between routing and recording the result.
+    Entries are only correct while game engine writes go through this gateway.
+    """
+
+    def __init__(self, routing: GameEngineRoutingTable, max_size: int = USER_SHARD_CACHE_SIZE):
+        self.routing = routing
+        self.max_size = max_size
+        self._shards = OrderedDict()  # user_id -> shard index, None when the user has no game
+        self._locks = {}  # user_id -> [asyncio.Lock, number of waiters and holders]
+        self.lookups = 0
+
+    @asynccontextmanager
+    async def locked(self, user_ids):
+        """Hold the locks of all users; sorted order keeps batches from deadlocking"""
+        entries = []
+        for user_id in sorted(set(user_ids)):
+            entry = self._locks.setdefault(user_id, [asyncio.Lock(), 0])
+            entry[1] += 1
+            entries.append((user_id, entry))
+        acquired = []
+        try:
+            for _, entry in entries:
+                await entry[0].acquire()
+                acquired.append(entry[0])
+            yield
+        finally:
+            for lock in acquired:
+                lock.release()
+            for user_id, entry in entries:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[user_id]
+
+    async def _find_shard(self, user_id: int, shards) -> int | None:
+        """Ask the shards whether the user is in a game there; raises 503 when a shard can not answer"""
+        self.lookups += 1
+
+        async def ask(shard: int) -> bool:
+            service_url = self.routing.shard_urls[shard]
+            client = upstream_clients.get(service_url)
+            try:
+                response = await upstream_guards.get(service_url).call(
+                    lambda: client.get(f"/api/v1/users/{user_id}/"), retryable=True
+                )
+            except httpx.RequestError as e:
+                raise HTTPException(status_code=503, detail=f"Service unavailable: {str(e)}")
+            if response.status_code == 404:
+                return False
+            if response.status_code != 200:
+                raise HTTPException(status_code=503, detail=f"Shard {shard} lookup failed: {response.status_code}")
+            return True
+
+        shards = list(shards)
+        found = await asyncio.gather(*(ask(shard) for shard in shards))
+        return next((shard for shard, in_game in zip(shards, found) if in_game), None)
+
+    def _remember(self, user_id: int, shard: int | None):
+        self._shards[user_id] = shard
+        self._shards.move_to_end(user_id)
+        while len(self._shards) > self.max_size:
+            self._shards.popitem(last=False)
+
+    async def get_shard(self, user_id: int) -> int | None:
+        if user_id in self._shards:
+            self._shards.move_to_end(user_id)
+            return self._shards[user_id]
+        shard = await self._find_shard(user_id, range(self.routing.shard_count))
+        self._remember(user_id, shard)
+        return shard
+
+    async def prefetch(self, user_ids):
+        """Look up all unknown users at once"""
+        await asyncio.gather(*(
+            self.get_shard(user_id) for user_id in set(user_ids) if user_id not in self._shards
+        ))
+
+    async def route(self, operation: str, user_id: int, invite_code: int | None = None) -> int | None:
+        """Shard for a user operation. None means the join targets a game on
+        another shard than the user's current game and must be rejected"""
+        shard = await self.get_shard(user_id)
+        if operation != "join" or invite_code is None:
+            return shard if shard is not None else self.routing.shard_for_user_id(user_id)
+        target = self.routing.shard_for_invite_code(invite_code)
+        if shard is not None and shard != target:
+            # The game may have expired on its shard since the entry was recorded
+            shard = await self._find_shard(user_id, [shard])
+            self._remember(user_id, shard)
+        if shard is not None and shard != target:
+            return None
+        return target
+
+    def record(self, user_id: int, operation: str, shard: int, status_code: int):
+        """Update the entry from the status of an operation sent to shard"""
+        if status_code == 404 or (operation == "leave" and status_code == 200):
+            # 404: the shard does not know the user or the invite code, and
+            # operations only go to another shard when the user has no game
+            self._remember(user_id, None)
+        elif status_code in (200, 201, 406):
+            # Success, or refused because the user already has a game there
+            self._remember(user_id, shard)
+        elif status_code >= 500:
+            self._shards.pop(user_id, None)
+
+    def get_stats(self) -> dict:
+        return {"size": len(self._shards), "lookups": self.lookups, "locked_users": len(self._locks)}
+
+
+game_engine_routing = GameEngineRoutingTable(GAME_ENGINE_SHARD_URLS or [GAME_ENGINE_SERVICE_URL])
+user_shards = UserShardDirectory(game_engine_routing)
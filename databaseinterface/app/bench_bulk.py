@@ -0,0 +1,109 @@
+"""Rows/sec of /bulk/ vs. one /query/ INSERT per row.
+
+    python -m app.bench_bulk [--url http://localhost:8001/api/v1] [--rows 100000] [--per-row 2000]
+
+Runs against a live service, e.g. the compose stack: the default URL is the
+databaseinterface port published by docker-compose.yml, the same API is also
+reachable through the gateway at http://localhost:8000/api/v1/database.
+Creates a scratch table, fills it with per-row INSERTs, with /bulk/ COPY and
+with /bulk/ upserts over the copied rows, prints rows/sec for each and drops
+the table. Requests go one at a time over a single keep-alive connection.
+"""
+import argparse
+import http.client
+import json
+import time
+from urllib.parse import urlsplit
+
+TABLE = "bench_bulk_rows"
+COLUMNS = ["id", "name", "score"]
+
+
+class Client:
+    def __init__(self, url: str):
+        parts = urlsplit(url)
+        self.path = parts.path.rstrip("/")
+        self.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=600)
+
+    def post(self, path: str, payload: dict) -> dict:
+        self.connection.request(
+            "POST", f"{self.path}{path}", body=json.dumps(payload),
+            headers={"Content-Type": "application/json"}
+        )
+        response = self.connection.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"POST {path} returned {response.status}: {body.decode()}")
+        return json.loads(body)
+
+    def query(self, sql: str, params: dict = None) -> dict:
+        return self.post("/query/", {"sql": sql, "params": params or {}})
+
+    def close(self):
+        self.connection.close()
+
+
+def make_rows(count: int, score: int = 0) -> list[list]:
+    return [[index, f"player{index}", score + index % 100] for index in range(count)]
+
+
+def insert_per_row(client: Client, rows: list[list]):
+    sql = f"INSERT INTO {TABLE} (id, name, score) VALUES (:id, :name, :score)"
+    for row in rows:
+        client.query(sql, dict(zip(COLUMNS, row)))
+
+
+def insert_bulk(client: Client, rows: list[list], batch_rows: int, upsert: bool):
+    batch = {"table": TABLE, "columns": COLUMNS}
+    if upsert:
+        batch["on_conflict"] = {"keys": ["id"], "update": ["name", "score"]}
+    for start in range(0, len(rows), batch_rows):
+        client.post("/bulk/", {"batches": [{**batch, "rows": rows[start:start + batch_rows]}]})
+
+
+def measure(client: Client, write, rows: list[list]) -> float:
+    started = time.perf_counter()
+    write(rows)
+    elapsed = time.perf_counter() - started
+    count = client.query(f"SELECT count(*) FROM {TABLE}")["rows"][0][0]
+    if count < len(rows):
+        raise RuntimeError(f"Expected {len(rows)} rows in {TABLE}, found {count}")
+    return len(rows) / elapsed
+
+
+def bench(args):
+    client = Client(args.url)
+    client.query(f"DROP TABLE IF EXISTS {TABLE}")
+    client.query(f"CREATE TABLE {TABLE} (id bigint PRIMARY KEY, name text NOT NULL, score integer NOT NULL)")
+    try:
+        results = {}
+        results["query per row"] = measure(client, lambda rows: insert_per_row(client, rows), make_rows(args.per_row))
+        client.query(f"TRUNCATE {TABLE}")
+        results["bulk copy"] = measure(
+            client, lambda rows: insert_bulk(client, rows, args.batch_rows, upsert=False), make_rows(args.rows)
+        )
+        # The upsert rewrites every copied row, so each one takes the ON CONFLICT DO UPDATE path
+        results["bulk upsert"] = measure(
+            client, lambda rows: insert_bulk(client, rows, args.batch_rows, upsert=True), make_rows(args.rows, 1)
+        )
+    finally:
+        client.query(f"DROP TABLE IF EXISTS {TABLE}")
+        client.close()
+
+    print(f"{args.url}: {args.per_row} rows one per /query/, {args.rows} rows via /bulk/ in batches of {args.batch_rows}")
+    for mode, rows_per_second in results.items():
+        print(f"{mode:<14} {rows_per_second:>10.0f} rows/s")
+    print(f"bulk copy / query per row: {results['bulk copy'] / results['query per row']:.0f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rows/sec of /bulk/ vs. per-row /query/ inserts")
+    parser.add_argument("--url", default="http://localhost:8001/api/v1", help="databaseinterface API base URL")
+    parser.add_argument("--rows", type=int, default=100000, help="rows written through /bulk/")
+    parser.add_argument("--per-row", type=int, default=2000, help="rows written one /query/ at a time")
+    parser.add_argument("--batch-rows", type=int, default=10000, help="rows per /bulk/ request")
+    bench(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import json
+import re
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+from app.config import BULK_CHUNK_SIZE
+from app.schemas import BulkBatch
+from app.utils import engine
+
+IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# asyncpg sends parameters in binary form, so JSON values are converted to the column type first
+CONVERTERS = {
+    "timestamp": datetime.fromisoformat,
+    "timestamptz": datetime.fromisoformat,
+    "date": date.fromisoformat,
+    "time": time.fromisoformat,
+    "numeric": lambda value: Decimal(str(value)),
+    "uuid": uuid.UUID,
+    "json": json.dumps,
+    "jsonb": json.dumps,
+}
+
+class BulkWriteError(ValueError):
+    pass
+
+def quote(name: str) -> str:
+    if not IDENTIFIER.match(name):
+        raise BulkWriteError(f"Invalid identifier: {name}")
+    return f'"{name}"'
+
+def build_upsert(batch: BulkBatch) -> str:
+    columns = ", ".join(quote(column) for column in batch.columns)
+    placeholders = ", ".join(f"${index}" for index in range(1, len(batch.columns) + 1))
+    sql = f"INSERT INTO {quote(batch.table)} ({columns}) VALUES ({placeholders})"
+    keys = ", ".join(quote(key) for key in batch.on_conflict.keys)
+    if not batch.on_conflict.update:
+        return f"{sql} ON CONFLICT ({keys}) DO NOTHING"
+    updates = ", ".join(f"{quote(column)} = EXCLUDED.{quote(column)}" for column in batch.on_conflict.update)
+    return f"{sql} ON CONFLICT ({keys}) DO UPDATE SET {updates}"
+
+async def get_converters(connection, batch: BulkBatch) -> list:
+    columns = ", ".join(quote(column) for column in batch.columns)
+    statement = await connection.prepare(f"SELECT {columns} FROM {quote(batch.table)} LIMIT 0")
+    return [CONVERTERS.get(attribute.type.name) for attribute in statement.get_attributes()]
+
+def convert_rows(rows: list[list], converters: list) -> list[tuple]:
+    if not any(converters):
+        return [tuple(row) for row in rows]
+    return [
+        tuple(
+            value if converter is None or value is None else converter(value)
+            for converter, value in zip(converters, row)
+        )
+        for row in rows
+    ]
+
+async def write_batches(batches: list[BulkBatch], chunk_size: int = BULK_CHUNK_SIZE) -> list[dict]:
+    """Write all batches in one transaction.
+
+    Plain inserts use COPY, batches with on_conflict use executemany of a
+    single prepared INSERT ... ON CONFLICT. Rows are sent chunk_size at a time.
+    """
+    for batch in batches:
+        if any(len(row) != len(batch.columns) for row in batch.rows):
+            raise BulkWriteError(f"Every row of {batch.table} must have {len(batch.columns)} values")
+
+    results = []
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        connection = raw.driver_connection
+        async with connection.transaction():
+            for batch in batches:
+                if batch.rows:
+                    converters = await get_converters(connection, batch)
+                    upsert = build_upsert(batch) if batch.on_conflict is not None else None
+                    for start in range(0, len(batch.rows), chunk_size):
+                        records = convert_rows(batch.rows[start:start + chunk_size], converters)
+                        if upsert is None:
+                            await connection.copy_records_to_table(
+                                batch.table, records=records, columns=batch.columns
+                            )
+                        else:
+                            await connection.executemany(upsert, records)
+                results.append({"table": batch.table, "rows": len(batch.rows)})
+    return results
@@ -1,10 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+from functools import lru_cache
+import json
+from app.config import STATEMENT_CACHE_SIZE, QUERY_STREAM_BATCH_SIZE
 from app.dependencies import get_db
+from app.schemas import QueryRequest, StreamQueryRequest, QueryResponse, BulkRequest, BulkResponse
+from app.bulk import write_batches
+from app.utils import engine
 
 router = APIRouter()
 
+READ_ONLY = text("SET TRANSACTION READ ONLY")
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def get_statement(sql: str) -> TextClause:
+    """Parsed statements are reused, so repeated SQL hits SQLAlchemy's compiled cache
+    and asyncpg's per-connection prepared statement cache"""
+    return text(sql)
+
 @router.get("/query")
 async def execute_query(
     query: str,
@@ -19,6 +35,61 @@ async def execute_query(
         await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/query/", response_model=QueryResponse)
+async def run_query(
+    item: QueryRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """Execute a statement with bound parameters; read-only calls run in a
+    read-only transaction and are rolled back instead of committed"""
+    try:
+        if item.read_only:
+            await db.execute(READ_ONLY)
+        result = await db.execute(get_statement(item.sql), item.params)
+        if result.returns_rows:
+            response = {"columns": list(result.keys()), "rows": [list(row) for row in result]}
+        else:
+            response = {"columns": [], "rows": []}
+        response["rowcount"] = result.rowcount
+        if item.read_only:
+            await db.rollback()
+        else:
+            await db.commit()
+        return response
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/query/stream/")
+async def stream_query(item: StreamQueryRequest):
+    """Stream a read-only query as NDJSON through a server-side cursor: the
+    first line holds the column names, every next line is one row. A query
+    that fails ends the stream with an {"error": ...} line.
+
+    The connection is opened inside the body iterator, so nothing is held
+    if the client goes away before the response starts."""
+    async def lines():
+        # Closing the connection rolls the read-only transaction back
+        async with engine.connect() as conn:
+            try:
+                await conn.execute(READ_ONLY)
+                result = await conn.stream(get_statement(item.sql), item.params)
+                yield json.dumps({"columns": list(result.keys())}) + "\n"
+                async for partition in result.partitions(QUERY_STREAM_BATCH_SIZE):
+                    yield "".join(json.dumps(list(row), default=str) + "\n" for row in partition)
+            except Exception as e:
+                yield json.dumps({"error": str(e)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.post("/bulk/", response_model=BulkResponse)
+async def bulk_write(item: BulkRequest):
+    """Insert or upsert batches of rows into several tables in one transaction"""
+    try:
+        return {"results": await write_batches(item.batches)}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/health")
 async def db_health_check(db: AsyncSession = Depends(get_db)):
     """Check database connection health"""
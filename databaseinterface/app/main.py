@@ -1,4 +1,5 @@
 from fastapi import FastAPI
+from prometheus_fastapi_instrumentator import Instrumentator
 from app.endpoints import database
 from app.utils import init_db
 import asyncio
@@ -9,6 +10,13 @@ app = FastAPI(
     description="Microservice for database operations"
 )
 
+# Prometheus metrics: per-route counts, latency histograms and in-flight gauge at /metrics
+Instrumentator(
+    should_instrument_requests_inprogress=True,
+    inprogress_labels=True,
+    excluded_handlers=["/metrics"]
+).instrument(app).expose(app, include_in_schema=False)
+
 app.include_router(
     database.router,
     prefix="/api/v1",
@@ -0,0 +1,36 @@
+from pydantic import BaseModel
+from typing import Any, Optional
+
+class QueryRequest(BaseModel):
+    sql: str
+    params: dict[str, Any] = {}
+    read_only: bool = False
+
+class StreamQueryRequest(BaseModel):
+    sql: str
+    params: dict[str, Any] = {}
+
+class QueryResponse(BaseModel):
+    columns: list[str]
+    rows: list[list[Any]]
+    rowcount: int
+
+class OnConflict(BaseModel):
+    keys: list[str]
+    update: list[str] = []
+
+class BulkBatch(BaseModel):
+    table: str
+    columns: list[str]
+    rows: list[list[Any]]
+    on_conflict: Optional[OnConflict] = None
+
+class BulkRequest(BaseModel):
+    batches: list[BulkBatch]
+
+class BulkResult(BaseModel):
+    table: str
+    rows: int
+
+class BulkResponse(BaseModel):
+    results: list[BulkResult]
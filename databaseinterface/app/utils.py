@@ -1,9 +1,12 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from app.config import DATABASE_URL
+from app.config import DATABASE_URL, STATEMENT_CACHE_SIZE
 from app.models import Base
 
-engine = create_async_engine(DATABASE_URL)
+engine = create_async_engine(
+    DATABASE_URL,
+    connect_args={"prepared_statement_cache_size": STATEMENT_CACHE_SIZE}
+)
 async_session = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
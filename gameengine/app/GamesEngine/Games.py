@@ -1,7 +1,22 @@
-import random
+import asyncio
+import logging
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
 from app.error.error import AccessError, GameAmountError, IsNotConnectedError, NotHostError
+from app.GamesEngine.invite_codes import InviteCodeAllocator, get_shard_code_range
+from app.GamesEngine.storage import GameStorage, MemoryGameStorage
+from app.GamesEngine.statuses import GameStatus
+from app.GamesEngine import events
+from app.GamesEngine.events import LobbyEvents
+
+logger = logging.getLogger(__name__)
 
 class User():
+    __slots__ = ("id",)
+
     def __init__(self, user_id : int):
         self.id = user_id
 
@@ -9,119 +24,429 @@ class User():
         return self.id
 
 class Game():
-    id = 0
-    def __init__(self, name : str, main_user : User):
-        self.name = name
-        self.main_user = main_user
-        self.id = Game.id
-        self.users = [main_user]
-        Game.id += 1
-        self.invite_code = self.generate_invite_code()
-
-        self.is_started = False
-        self.status = "Waiting for users"
+    # __slots__ и id игроков в array('q') вместо словаря User-объектов:
+    # игра занимает в несколько раз меньше памяти
+    __slots__ = ("name", "main_user_id", "id", "user_ids", "invite_code", "status", "last_activity", "lock")
+    _next_id = 0
 
-    def get_main_user_id(self):
-        return self.main_user.get_id()
+    def __init__(self, name : str, main_user_id : int, invite_code : int, game_id : int = None):
+        self.name = sys.intern(name)
+        self.main_user_id = main_user_id
+        if game_id is None:
+            game_id = Game._next_id
+        self.id = game_id
+        self.user_ids = array("q", (main_user_id,))
+        Game._next_id = max(Game._next_id, game_id + 1)
+        self.invite_code = invite_code
 
-    def generate_invite_code(self):
-        return random.randint(100000, 999999)
+        self.status = GameStatus.WAITING_FOR_USERS
+        self.last_activity = time.monotonic()
+        self.lock = threading.Lock()
+
+    def get_id(self):
+        return self.id
+
+    def get_main_user_id(self):
+        return self.main_user_id
 
     def get_invite_code(self):
         return self.invite_code
 
-    def add_user(self, user : User):
-        self.users.append(user)
+    def add_user(self, user_id : int):
+        if user_id not in self.user_ids:
+            self.user_ids.append(user_id)
 
-    def delete_user(self, user : User):
-        for old_user in self.users:
-            if old_user.get_id() == user.get_id():
-                self.users.remove(old_user)
+    def delete_user(self, user_id : int):
+        if user_id in self.user_ids:
+            self.user_ids.remove(user_id)
 
     def get_user_ids(self):
-        return [user.get_id() for user in self.users]
+        return self.user_ids.tolist()
 
+    @property
+    def is_started(self):
+        return self.status == GameStatus.STARTED
 
     def start(self):
-        self.is_started = True
-        self.status = "Started"
+        self.status = GameStatus.STARTED
 
     def get_status(self):
         return self.status
 
+    def touch(self):
+        self.last_activity = time.monotonic()
+
     def check_user(self, user_id):
-        for user in self.users:
-            if user.get_id() == user_id:
-                return True
-        return False
+        return user_id in self.user_ids
+
+    def to_snapshot(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "main_user_id": self.main_user_id,
+            "user_ids": self.get_user_ids(),
+            "invite_code": self.invite_code,
+            "is_started": self.is_started,
+            "status": self.status.label,
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot : dict):
+        game = cls(snapshot["name"], snapshot["main_user_id"],
+                   snapshot["invite_code"], game_id=snapshot["id"])
+        # Список игроков восстанавливается как есть: вышедший хост не возвращается
+        game.user_ids = array("q", snapshot["user_ids"])
+        game.status = GameStatus.from_label(snapshot["status"])
+        return game
 
 
 
 
 class GamesEngine():
-    def __init__(self) -> None:
-        self.games = []
+    """
+    Потокобезопасный движок игр без глобальной блокировки.
+
+    Изменения одной игры идут под ее собственным lock, поэтому операции над
+    разными играми не конкурируют. Пользователь занимается в индексе
+    атомарным dict.setdefault, так что он не может попасть в две игры сразу.
+    Порядок захвата: lock игры -> _activity_lock / _allocation_lock.
+    """
+    def __init__(self, storage : GameStorage = None, shard_index : int = 0, shard_count : int = 1,
+                 ttls : dict = None, sweep_interval : float = 60, sweep_batch_size : int = 1000) -> None:
+        # Индексы поддерживаются при каждом изменении, поиск за O(1)
+        self.games = {}                  # game_id -> Game
+        self.games_by_invite_code = {}   # invite_code -> Game
+        self.games_by_user_id = {}       # user_id -> Game
+        self.games_by_main_user_id = {}  # main_user_id -> Game
+        # Шард владеет играми с id % shard_count == shard_index
+        # и своим диапазоном кодов приглашения
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self._next_game_id = shard_index
+        self.invite_codes = InviteCodeAllocator(*get_shard_code_range(shard_index, shard_count))
+        self._allocation_lock = threading.Lock()
+        self.storage = storage if storage is not None else MemoryGameStorage()
+        self.events = LobbyEvents()
+
+        # status -> {game_id: last_activity} в порядке постановки в очередь.
+        # Смена статуса сразу переносит игру в очередь нового статуса (очередь
+        # статуса с TTL 0 не просматривается). Join/leave обновляют только
+        # саму игру, а очистка лениво переносит в конец очереди игры,
+        # активность которых изменилась
+        self.ttls = ttls or {}
+        self.sweep_interval = sweep_interval
+        self.sweep_batch_size = sweep_batch_size
+        self.games_by_activity = {status: OrderedDict() for status in GameStatus}
+        self._activity_lock = threading.Lock()
+        self.evicted_games_count = 0
+        self._sweeper = None
+
+    async def start(self):
+        await self.storage.start()
+        for snapshot in await self.storage.load():
+            if self.owns_game_id(snapshot["id"]):
+                self._add_game(Game.from_snapshot(snapshot))
+        if any(self.ttls.values()):
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+        await self.storage.stop()
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                while self.evict_idle_games() == self.sweep_batch_size:
+                    # Отдаем управление между пачками, чтобы не держать event loop
+                    await asyncio.sleep(0)
+            except Exception as e:
+                logger.error(f"Idle game sweep failed: {e}")
+
+    def _is_expired(self, game : Game, now : float):
+        ttl = self.ttls.get(game.get_status())
+        return bool(ttl) and now - game.last_activity >= ttl
+
+    def evict_idle_games(self, now : float = None):
+        """Удаляет не больше sweep_batch_size игр, простоявших дольше TTL своего статуса"""
+        if now is None:
+            now = time.monotonic()
+        expired = []
+        with self._activity_lock:
+            for status, queue in self.games_by_activity.items():
+                ttl = self.ttls.get(status)
+                if not ttl:
+                    continue
+                while queue and len(expired) < self.sweep_batch_size:
+                    game_id, last_activity = next(iter(queue.items()))
+                    game = self.games.get(game_id)
+                    if game is None:
+                        del queue[game_id]
+                        continue
+                    if game.get_status() != status or game.last_activity != last_activity:
+                        del queue[game_id]
+                        self.games_by_activity[game.get_status()][game_id] = game.last_activity
+                        continue
+                    if now - last_activity < ttl:
+                        break
+                    del queue[game_id]
+                    expired.append(game)
+        evicted = 0
+        for game in expired:
+            with game.lock:
+                # Игра могла ожить, пока ее не держали под lock
+                if self._is_expired(game, now) and self._delete_locked(game):
+                    evicted += 1
+                    continue
+            self._enqueue_activity(game)
+        self.evicted_games_count += evicted
+        return len(expired)
+
+    def get_stats(self):
+        games = list(self.games.values())
+        games_by_status = {status.label: 0 for status in GameStatus}
+        for game in games:
+            games_by_status[game.get_status().label] += 1
+        return {
+            "live_games": len(games),
+            "evicted_games": self.evicted_games_count,
+            "games_by_status": games_by_status,
+            "event_subscribers": self.events.get_subscribers_count(),
+        }
+
+    def _enqueue_activity(self, game : Game):
+        with self._activity_lock:
+            if self.games.get(game.get_id()) is game:
+                self.games_by_activity[game.get_status()][game.get_id()] = game.last_activity
+
+    def _move_activity(self, game : Game, previous_status : GameStatus):
+        with self._activity_lock:
+            self.games_by_activity[previous_status].pop(game.get_id(), None)
+            if self.games.get(game.get_id()) is game:
+                self.games_by_activity[game.get_status()][game.get_id()] = game.last_activity
+
+    def owns_game_id(self, game_id : int):
+        return game_id % self.shard_count == self.shard_index
+
+    def _save(self, game : Game):
+        self.storage.save(game.to_snapshot())
 
     def create_game(self, user_id : int, name : str):
-        self.games.append(Game(name, User(user_id)))
-        return self.games[-1].get_invite_code()
+        if self.check_user(user_id):
+            raise GameAmountError("Пользователь уже присоединен к другой игре")
+        with self._allocation_lock:
+            invite_code = self.invite_codes.allocate()
+            game_id = self._next_game_id
+            self._next_game_id += self.shard_count
+        game = Game(name, user_id, invite_code, game_id=game_id)
+        with game.lock:
+            if self.games_by_user_id.setdefault(user_id, game) is not game:
+                with self._allocation_lock:
+                    self.invite_codes.release(invite_code)
+                raise GameAmountError("Пользователь уже присоединен к другой игре")
+            self.games[game_id] = game
+            self.games_by_main_user_id[user_id] = game
+            self.games_by_invite_code[invite_code] = game
+            self._save(game)
+        self._enqueue_activity(game)
+        return invite_code
 
     def append_game(self, game : Game):
-        self.games.append(game)
+        self._add_game(game)
+        with game.lock:
+            self._save(game)
+
+    def _add_game(self, game : Game):
+        if not self.owns_game_id(game.get_id()):
+            raise ValueError("Game belongs to another shard")
+        with self._allocation_lock:
+            self.invite_codes.reserve(game.get_invite_code())
+            self._next_game_id = max(self._next_game_id, game.get_id() + self.shard_count)
+        with game.lock:
+            claimed = []
+            for user_id in game.get_user_ids():
+                if self.games_by_user_id.setdefault(user_id, game) is not game:
+                    for claimed_id in claimed:
+                        del self.games_by_user_id[claimed_id]
+                    with self._allocation_lock:
+                        self.invite_codes.release(game.get_invite_code())
+                    raise GameAmountError("Пользователь уже присоединен к другой игре")
+                claimed.append(user_id)
+            self.games[game.get_id()] = game
+            if game.check_user(game.get_main_user_id()):
+                self.games_by_main_user_id[game.get_main_user_id()] = game
+            self.games_by_invite_code[game.get_invite_code()] = game
+        self._enqueue_activity(game)
 
     def get_game_id(self, user_id):
-        self.get_game(user_id).get_id()
+        return self.get_game(user_id).get_id()
 
     def get_game(self, user_id):
-        for game in self.games:
-            if user_id in game.get_user_ids():
-                return game
+        return self.games_by_user_id.get(user_id)
+
+    def get_game_by_invite_code(self, invite_code):
+        return self.games_by_invite_code.get(invite_code)
 
     def get_invite_code(self, user_id):
-        for game in self.games:
-            if user_id in game.get_user_ids():
-                return game.get_id()
+        game = self.get_game(user_id)
+        if game is not None:
+            return game.get_invite_code()
 
     def delete_game(self, game : Game):
-        self.games.remove(game)
+        with game.lock:
+            self._delete_locked(game)
+
+    def _delete_locked(self, game : Game):
+        if self.games.get(game.get_id()) is not game:
+            return False
+        del self.games[game.get_id()]
+        del self.games_by_invite_code[game.get_invite_code()]
+        if game.check_user(game.get_main_user_id()):
+            del self.games_by_main_user_id[game.get_main_user_id()]
+        for user_id in game.get_user_ids():
+            del self.games_by_user_id[user_id]
+        self.storage.delete(game.get_id())
+        self.events.publish(game.get_id(), events.GAME_DELETED)
+        with self._activity_lock:
+            for queue in self.games_by_activity.values():
+                queue.pop(game.get_id(), None)
+        with self._allocation_lock:
+            self.invite_codes.release(game.get_invite_code())
+        return True
 
     def delete_game_by_main_user_id(self, user_id: int):
-        for game in self.games:
-            if game.get_main_user_id() == user_id:
-                self.games.remove(game)
-                break
+        game = self.games_by_main_user_id.get(user_id)
+        if game is not None:
+            self.delete_game(game)
 
     def add_user(self, user_id : int, invite_code : int):
+        """Присоединяет пользователя и возвращает id остальных игроков"""
         if self.check_user(user_id):
             raise GameAmountError("Пользователь уже присоединен к другой игре")
-        for game in self.games:
-            if game.get_invite_code() == invite_code:
-                game.add_user(User(user_id))
-                return True
-        raise ValueError("Invalid Invite Code")
+        game = self.get_game_by_invite_code(invite_code)
+        if game is None:
+            raise ValueError("Invalid Invite Code")
+        with game.lock:
+            if self.games.get(game.get_id()) is not game:
+                raise ValueError("Invalid Invite Code")
+            if self.games_by_user_id.setdefault(user_id, game) is not game:
+                raise GameAmountError("Пользователь уже присоединен к другой игре")
+            game.add_user(user_id)
+            if user_id == game.get_main_user_id():
+                # Хост вернулся в свою игру
+                self.games_by_main_user_id[user_id] = game
+            game.touch()
+            self._save(game)
+            self.events.publish(game.get_id(), events.USER_JOINED, user_id=user_id)
+            # Список берется под тем же lock: после его снятия пользователь
+            # может выйти, а игра - удалиться
+            return [id for id in game.get_user_ids() if id != user_id]
 
     def remove_user(self, user_id : int):
-        for game in self.games:
-            if game.check_user(user_id):
-                game.delete_user(User(user_id))
-                return True
-        raise IsNotConnectedError("Пользователь не присоединен ни к одной игре")
+        game = self.get_game(user_id)
+        if game is None:
+            raise IsNotConnectedError("Пользователь не присоединен ни к одной игре")
+        with game.lock:
+            if self.games_by_user_id.get(user_id) is not game:
+                raise IsNotConnectedError("Пользователь не присоединен ни к одной игре")
+            if user_id == game.get_main_user_id():
+                del self.games_by_main_user_id[user_id]
+            del self.games_by_user_id[user_id]
+            game.delete_user(user_id)
+            game.touch()
+            self._save(game)
+            self.events.publish(game.get_id(), events.USER_LEFT, user_id=user_id)
+        return True
 
     def check_user(self, user_id):
-        for game in self.games:
-            if game.check_user(user_id):
-                return True
-        return False
+        return user_id in self.games_by_user_id
 
     def start_game(self, user_id):
-        if not self.check_user(user_id):
+        game = self.get_game(user_id)
+        if game is None:
             raise IsNotConnectedError("Пользователь не присоединен ни к одной игре")
-        for game in self.games:
-            if game.get_main_user_id() == user_id:
-                game.start()
-                return game.get_user_ids()
-        raise NotHostError("User is not host")
+        with game.lock:
+            if self.games_by_user_id.get(user_id) is not game:
+                raise IsNotConnectedError("Пользователь не присоединен ни к одной игре")
+            if game.get_main_user_id() != user_id:
+                raise NotHostError("User is not host")
+            previous_status = game.get_status()
+            game.start()
+            game.touch()
+            self._save(game)
+            self.events.publish(game.get_id(), events.GAME_STARTED, user_ids=game.get_user_ids())
+            if game.get_status() != previous_status:
+                self._move_activity(game, previous_status)
+                self.events.publish(game.get_id(), events.STATUS_CHANGED, status=game.get_status().label)
+            return game.get_user_ids()
 
     def get_user_ids(self, user_id):
-        return self.get_game(user_id).get_user_ids()
+        game = self.get_game(user_id)
+        if game is None:
+            raise IsNotConnectedError("Пользователь не присоединен ни к одной игре")
+        with game.lock:
+            if self.games_by_user_id.get(user_id) is not game:
+                raise IsNotConnectedError("Пользователь не присоединен ни к одной игре")
+            return game.get_user_ids()
+
+    def join_game(self, user_id : int, invite_code : int):
+        """Присоединяет пользователя и возвращает id остальных игроков"""
+        return self.add_user(user_id, invite_code)
+
+    def apply_batch(self, operations : list):
+        """
+        Применяет операции по порядку. Ошибка одной операции не отменяет
+        остальные: для каждой возвращается (результат, None) или (None, ошибка)
+        """
+        handlers = {
+            "create": lambda operation: self.create_game(operation.user_id, operation.game),
+            "join": lambda operation: self.join_game(operation.user_id, operation.invite_code),
+            "leave": lambda operation: self.remove_user(operation.user_id),
+            "start": lambda operation: self.start_game(operation.user_id),
+        }
+        results = []
+        for operation in operations:
+            try:
+                results.append((handlers[operation.op](operation), None))
+            except ValueError as e:
+                results.append((None, e))
+        return results
+
+    def get_state(self, game : Game):
+        with game.lock:
+            return {
+                "type": "state",
+                "game_id": game.get_id(),
+                "user_ids": game.get_user_ids(),
+                "status": game.get_status().label,
+            }
 
+    async def stream_events(self, game : Game, keepalive : float = 5):
+        """
+        Текущее состояние игры, затем ее события до удаления.
+        None означает, что событий не было keepalive секунд.
+        """
+        subscription = self.events.subscribe(game.get_id())
+        try:
+            if self.games.get(game.get_id()) is not game:
+                yield {"type": events.GAME_DELETED, "game_id": game.get_id()}
+                return
+            yield self.get_state(game)
+            queue = subscription[1]
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield event
+                if event["type"] in events.FINAL_EVENTS:
+                    return
+        finally:
+            self.events.unsubscribe(game.get_id(), subscription)
@@ -0,0 +1,72 @@
+"""
+Задержка join и поиска игры при разном числе открытых лобби:
+python -m app.GamesEngine.bench_lookups [--sizes 10,100,...] [--operations N]
+
+Все поиски идут по индексам, поэтому время операции не должно расти с
+числом игр. Каждая операция замеряется отдельно, выводятся медиана и p99.
+"""
+import argparse
+import random
+import statistics
+import time
+from app.GamesEngine.Games import GamesEngine
+
+
+def percentile(samples : list, fraction : float):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def measure(games_count : int, operations : int, rng : random.Random):
+    engine = GamesEngine()
+    codes = [engine.create_game(host_id, "lobby") for host_id in range(games_count)]
+    next_user_id = games_count
+
+    joins = []
+    lookups = []
+    for _ in range(operations):
+        invite_code = rng.choice(codes)
+        started = time.perf_counter_ns()
+        engine.join_game(next_user_id, invite_code)
+        joins.append(time.perf_counter_ns() - started)
+
+        user_id = rng.randrange(next_user_id + 1)
+        started = time.perf_counter_ns()
+        engine.get_game_by_invite_code(invite_code)
+        engine.check_user(user_id)
+        engine.get_game(user_id)
+        lookups.append(time.perf_counter_ns() - started)
+
+        # Игрок выходит, чтобы лобби не разрастались за время замера
+        engine.remove_user(next_user_id)
+        next_user_id += 1
+
+    joins.sort()
+    lookups.sort()
+    return {
+        "join_p50": statistics.median(joins) / 1000,
+        "join_p99": percentile(joins, 0.99) / 1000,
+        "lookup_p50": statistics.median(lookups) / 1000,
+        "lookup_p99": percentile(lookups, 0.99) / 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000,10000,100000")
+    parser.add_argument("--operations", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'games':>8} {'join p50':>10} {'join p99':>10} {'lookup p50':>11} {'lookup p99':>11}   (us)")
+    results = []
+    for size in (int(size) for size in args.sizes.split(",")):
+        result = measure(size, args.operations, rng)
+        results.append(result)
+        print(f"{size:>8} {result['join_p50']:>10.2f} {result['join_p99']:>10.2f} "
+              f"{result['lookup_p50']:>11.2f} {result['lookup_p99']:>11.2f}")
+    print(f"join p50 largest / smallest: {results[-1]['join_p50'] / results[0]['join_p50']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Память на одну игру в GamesEngine: python -m app.GamesEngine.bench_memory [--games N] [--players K]
+
+Считается tracemalloc-ом все, что выделено при создании игр: сами игры со
+списками игроков и lock, записи во всех индексах движка, очередь активности
+и сдвинутые коды в InviteCodeAllocator. В шестизначном пространстве кодов
+помещается 900 000 игр, поэтому для 1M лобби диапазон кодов расширен.
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from app.GamesEngine.Games import GamesEngine
+from app.GamesEngine.invite_codes import InviteCodeAllocator, MIN_INVITE_CODE
+
+
+def get_container_sizes(engine : GamesEngine):
+    """Размеры самих словарей индексов; записи в них - это ссылки на игры"""
+    return {
+        "games (game_id)": sys.getsizeof(engine.games),
+        "games_by_invite_code": sys.getsizeof(engine.games_by_invite_code),
+        "games_by_user_id": sys.getsizeof(engine.games_by_user_id),
+        "games_by_main_user_id": sys.getsizeof(engine.games_by_main_user_id),
+        "games_by_activity": sum(sys.getsizeof(queue) for queue in engine.games_by_activity.values()),
+        "invite code allocator": sys.getsizeof(engine.invite_codes._slots) + sys.getsizeof(engine.invite_codes._places),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--games", type=int, default=1_000_000)
+    parser.add_argument("--players", type=int, default=1, help="игроков в лобби, включая хоста")
+    args = parser.parse_args()
+
+    gc.collect()
+    tracemalloc.start()
+    engine = GamesEngine()
+    engine.invite_codes = InviteCodeAllocator(MIN_INVITE_CODE, MIN_INVITE_CODE + 2 * args.games - 1)
+    before, _ = tracemalloc.get_traced_memory()
+
+    started = time.perf_counter()
+    user_id = 0
+    for _ in range(args.games):
+        host_id = user_id
+        invite_code = engine.create_game(host_id, "lobby")
+        for player_id in range(host_id + 1, host_id + args.players):
+            engine.join_game(player_id, invite_code)
+        user_id += args.players
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total = after - before
+    containers = get_container_sizes(engine)
+    print(f"{args.games} lobbies x {args.players} players, created in {elapsed:.1f}s")
+    print(f"{'total':<24}{total / args.games:>10.1f} bytes/game  ({total / 2 ** 20:.1f} MiB)")
+    for name, size in containers.items():
+        print(f"  {name:<22}{size / args.games:>10.1f} bytes/game")
+    rest = total - sum(containers.values())
+    print(f"  {'Game objects':<22}{rest / args.games:>10.1f} bytes/game  (Game, lock, player array, index keys)")
+
+
+if __name__ == "__main__":
+    main()
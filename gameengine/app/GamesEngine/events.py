@@ -0,0 +1,64 @@
+import asyncio
+import threading
+
+# Типы событий лобби
+USER_JOINED = "user_joined"
+USER_LEFT = "user_left"
+GAME_STARTED = "game_started"
+STATUS_CHANGED = "status_changed"
+GAME_DELETED = "game_deleted"
+OVERFLOW = "overflow"
+
+# После этих событий поток подписчика закрывается
+FINAL_EVENTS = (GAME_DELETED, OVERFLOW)
+
+
+def _deliver(queue : asyncio.Queue, event : dict):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        # Подписчик не успевает читать: сообщаем ему об этом и закрываем поток,
+        # чтобы он перечитал состояние, а не получил события с пропусками
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait({"type": OVERFLOW})
+
+
+class LobbyEvents():
+    """
+    Pub/sub событий лобби внутри процесса. Публикация возможна из любого
+    потока: событие передается в event loop подписчика через
+    call_soon_threadsafe, порядок событий одной игры сохраняется.
+    """
+    def __init__(self, queue_size : int = 100):
+        self.queue_size = queue_size
+        self.subscribers = {}  # game_id -> {(loop, queue)}
+        self._lock = threading.Lock()
+
+    def subscribe(self, game_id : int):
+        subscription = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.queue_size))
+        with self._lock:
+            self.subscribers.setdefault(game_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, game_id : int, subscription):
+        with self._lock:
+            subscriptions = self.subscribers.get(game_id)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscribers[game_id]
+
+    def publish(self, game_id : int, event_type : str, **data):
+        subscriptions = self.subscribers.get(game_id)
+        if not subscriptions:
+            return
+        event = {"type": event_type, "game_id": game_id, **data}
+        with self._lock:
+            subscriptions = list(subscriptions)
+        for loop, queue in subscriptions:
+            loop.call_soon_threadsafe(_deliver, queue, event)
+
+    def get_subscribers_count(self):
+        return sum(len(subscriptions) for subscriptions in list(self.subscribers.values()))
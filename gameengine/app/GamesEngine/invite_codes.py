@@ -0,0 +1,81 @@
+import random
+from app.error.error import InviteCodeError
+
+MIN_INVITE_CODE = 100000
+MAX_INVITE_CODE = 999999
+
+
+class InviteCodeAllocator():
+    """
+    Раздает уникальные коды приглашения за O(1).
+
+    Все коды образуют перестановку: позиции [0, free) заняты свободными
+    кодами, [free, size) - выданными. Выдача берет случайную свободную
+    позицию и меняет ее местами с последней свободной (ленивый
+    Фишер-Йейтс), возврат кода - обратный обмен. В словарях хранятся
+    только сдвинутые коды, поэтому память растет с числом выдач,
+    а не с размером пространства кодов.
+    """
+    def __init__(self, min_code : int = MIN_INVITE_CODE, max_code : int = MAX_INVITE_CODE):
+        self.min_code = min_code
+        self.size = max_code - min_code + 1
+        self.free = self.size
+        self._random = random.SystemRandom()
+        self._slots = {}   # позиция -> код (только сдвинутые)
+        self._places = {}  # код -> позиция (только сдвинутые)
+
+    def _code_at(self, position : int):
+        return self._slots.get(position, self.min_code + position)
+
+    def _position_of(self, code : int):
+        return self._places.get(code, code - self.min_code)
+
+    def _put(self, position : int, code : int):
+        if code == self.min_code + position:
+            self._slots.pop(position, None)
+            self._places.pop(code, None)
+        else:
+            self._slots[position] = code
+            self._places[code] = position
+
+    def _swap(self, first : int, second : int):
+        first_code = self._code_at(first)
+        second_code = self._code_at(second)
+        self._put(first, second_code)
+        self._put(second, first_code)
+
+    def _in_range(self, code : int):
+        return 0 <= code - self.min_code < self.size
+
+    def is_allocated(self, code : int):
+        return self._in_range(code) and self._position_of(code) >= self.free
+
+    def allocate(self):
+        if self.free == 0:
+            raise InviteCodeError("Нет свободных кодов приглашения")
+        code = self._code_at(self._random.randrange(self.free))
+        self.reserve(code)
+        return code
+
+    def reserve(self, code : int):
+        if not self._in_range(code) or self.is_allocated(code):
+            raise InviteCodeError("Код приглашения уже занят")
+        self.free -= 1
+        self._swap(self._position_of(code), self.free)
+
+    def release(self, code : int):
+        if not self.is_allocated(code):
+            return
+        self._swap(self._position_of(code), self.free)
+        self.free += 1
+
+    def get_allocated_count(self):
+        return self.size - self.free
+
+
+def get_shard_code_range(shard_index : int, shard_count : int):
+    """Непрерывный диапазон кодов шарда: по коду шлюз находит владельца игры"""
+    size = (MAX_INVITE_CODE - MIN_INVITE_CODE + 1) // shard_count
+    min_code = MIN_INVITE_CODE + shard_index * size
+    max_code = MAX_INVITE_CODE if shard_index == shard_count - 1 else min_code + size - 1
+    return min_code, max_code
@@ -1,5 +1,27 @@
+from enum import IntEnum
+
+
 class Status():
     name : str
 
 class WaitingStatus(Status):
-    name : str = "Waiting for other players"
\ No newline at end of file
+    name : str = "Waiting for other players"
+
+class GameStatus(IntEnum):
+    WAITING_FOR_USERS = 0
+    STARTED = 1
+
+    @property
+    def label(self):
+        return _labels[self]
+
+    @classmethod
+    def from_label(cls, label : str):
+        return _statuses_by_label[label]
+
+
+_labels = {
+    GameStatus.WAITING_FOR_USERS: "Waiting for users",
+    GameStatus.STARTED: "Started",
+}
+_statuses_by_label = {label: status for status, label in _labels.items()}
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+from app.config import GAME_STORAGE, GAME_STORAGE_FLUSH_INTERVAL, GAME_STORAGE_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class GameStorage():
+    """
+    Хранилище игр для GamesEngine. Все операции над играми идут в памяти,
+    хранилище только получает снимки измененных игр и отдает их при старте.
+    """
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def load(self):
+        return []
+
+    def save(self, snapshot : dict):
+        pass
+
+    def delete(self, game_id : int):
+        pass
+
+
+class MemoryGameStorage(GameStorage):
+    pass
+
+
+class PostgresGameStorage(GameStorage):
+    """
+    Write-behind хранилище: изменения копятся в очереди (последний снимок
+    игры вытесняет предыдущие) и пишутся в Postgres пачками одной
+    транзакцией раз в flush_interval секунд или при batch_size изменениях.
+    """
+    def __init__(self, flush_interval : float = GAME_STORAGE_FLUSH_INTERVAL,
+                 batch_size : int = GAME_STORAGE_BATCH_SIZE):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.pending = {}  # game_id -> снимок игры или None для удаления
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def start(self):
+        from app.database import init_db
+        await init_db()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def load(self):
+        from sqlalchemy import select
+        from app.database import GameRecord, async_session
+        async with async_session() as session:
+            result = await session.execute(select(GameRecord))
+            return [
+                {
+                    "id": record.id,
+                    "name": record.name,
+                    "main_user_id": record.main_user_id,
+                    "user_ids": list(record.user_ids),
+                    "invite_code": record.invite_code,
+                    "is_started": record.is_started,
+                    "status": record.status,
+                }
+                for record in result.scalars()
+            ]
+
+    def save(self, snapshot : dict):
+        self.pending[snapshot["id"]] = snapshot
+        self._notify()
+
+    def delete(self, game_id : int):
+        self.pending[game_id] = None
+        self._notify()
+
+    def _notify(self):
+        if len(self.pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Game storage flush failed: {e}")
+
+    async def flush(self):
+        if not self.pending:
+            return
+        from sqlalchemy import delete
+        from sqlalchemy.dialects.postgresql import insert
+        from app.database import GameRecord, async_session
+
+        batch, self.pending = self.pending, {}
+        saved = [snapshot for snapshot in batch.values() if snapshot is not None]
+        deleted = [game_id for game_id, snapshot in batch.items() if snapshot is None]
+        try:
+            async with async_session.begin() as session:
+                if deleted:
+                    await session.execute(delete(GameRecord).where(GameRecord.id.in_(deleted)))
+                for start in range(0, len(saved), self.batch_size):
+                    statement = insert(GameRecord).values(saved[start:start + self.batch_size])
+                    await session.execute(statement.on_conflict_do_update(
+                        index_elements=[GameRecord.id],
+                        set_={
+                            column: statement.excluded[column]
+                            for column in saved[0] if column != "id"
+                        }
+                    ))
+        except Exception:
+            # Возвращаем в очередь то, что не было перезаписано новыми изменениями
+            for game_id, snapshot in batch.items():
+                self.pending.setdefault(game_id, snapshot)
+            raise
+
+
+def create_storage(kind : str = GAME_STORAGE) -> GameStorage:
+    if kind == "postgres":
+        return PostgresGameStorage()
+    if kind == "memory":
+        return MemoryGameStorage()
+    raise ValueError(f"Unknown game storage: {kind}")
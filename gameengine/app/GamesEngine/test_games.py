@@ -0,0 +1,88 @@
+import random
+import sys
+import threading
+import time
+from app.GamesEngine.Games import GamesEngine
+from app.GamesEngine.statuses import GameStatus
+
+THREADS = 8
+CALLS_PER_THREAD = 20000
+USERS = 400
+
+
+def check_indexes(engine : GamesEngine):
+    """Все индексы движка согласованы с самими играми"""
+    players = 0
+    for game_id, game in engine.games.items():
+        assert game.get_id() == game_id
+        assert engine.games_by_invite_code[game.get_invite_code()] is game
+        assert engine.invite_codes.is_allocated(game.get_invite_code())
+        user_ids = game.get_user_ids()
+        assert len(user_ids) == len(set(user_ids))
+        for user_id in user_ids:
+            assert engine.games_by_user_id[user_id] is game
+        players += len(user_ids)
+        host_in_game = game.check_user(game.get_main_user_id())
+        assert (engine.games_by_main_user_id.get(game.get_main_user_id()) is game) == host_in_game
+        # Живая игра стоит в очереди активности своего статуса
+        assert game_id in engine.games_by_activity[game.get_status()]
+    assert len(engine.games_by_user_id) == players
+    assert len(engine.games_by_invite_code) == len(engine.games)
+    assert len(engine.games_by_main_user_id) <= len(engine.games)
+    assert engine.invite_codes.get_allocated_count() == len(engine.games)
+
+
+def test_join_leave_start_under_contention():
+    engine = GamesEngine(ttls={GameStatus.WAITING_FOR_USERS: 0.001, GameStatus.STARTED: 0.002})
+    codes = []
+    errors = []
+
+    def worker(seed : int):
+        rng = random.Random(seed)
+        try:
+            for _ in range(CALLS_PER_THREAD):
+                user_id = rng.randrange(USERS)
+                action = rng.random()
+                try:
+                    if action < 0.15:
+                        codes.append(engine.create_game(user_id, "monopoly"))
+                    elif action < 0.5 and codes:
+                        others = engine.join_game(user_id, rng.choice(codes))
+                        assert user_id not in others
+                    elif action < 0.75:
+                        engine.remove_user(user_id)
+                    elif action < 0.9:
+                        assert user_id in engine.start_game(user_id)
+                    elif action < 0.97:
+                        engine.delete_game_by_main_user_id(user_id)
+                    else:
+                        engine.evict_idle_games(time.monotonic() + rng.random() / 100)
+                except ValueError:
+                    # Ожидаемые ошибки движка: чужая игра, неверный код, не хост и т.п.
+                    pass
+        except Exception as e:
+            errors.append(e)
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert errors == []
+    check_indexes(engine)
+
+
+def test_started_game_evicted_when_waiting_ttl_disabled():
+    # TTL 0 отключает очистку статуса, но не должен мешать очистке игр, сменивших статус
+    engine = GamesEngine(ttls={GameStatus.WAITING_FOR_USERS: 0, GameStatus.STARTED: 100})
+    engine.create_game(1, "monopoly")
+    engine.start_game(1)
+    engine.evict_idle_games(time.monotonic() + 1000)
+    assert engine.games == {}
+    check_indexes(engine)
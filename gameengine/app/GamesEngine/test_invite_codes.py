@@ -0,0 +1,52 @@
+import pytest
+from app.error.error import InviteCodeError
+from app.GamesEngine.invite_codes import InviteCodeAllocator, MIN_INVITE_CODE, MAX_INVITE_CODE, get_shard_code_range
+
+
+def test_unique_codes_at_90_percent_occupancy():
+    allocator = InviteCodeAllocator()
+    live = set()
+    for _ in range(allocator.size * 9 // 10):
+        code = allocator.allocate()
+        assert MIN_INVITE_CODE <= code <= MAX_INVITE_CODE
+        assert code not in live
+        live.add(code)
+    assert allocator.get_allocated_count() == len(live)
+
+    # Возврат и повторная выдача на высокой заполненности
+    released = list(live)[:100000]
+    for code in released:
+        allocator.release(code)
+        live.discard(code)
+        new_code = allocator.allocate()
+        assert new_code not in live
+        live.add(new_code)
+    assert allocator.get_allocated_count() == len(live)
+    assert all(allocator.is_allocated(code) for code in live)
+
+
+def test_exhausted_code_space():
+    allocator = InviteCodeAllocator(100, 109)
+    codes = {allocator.allocate() for _ in range(10)}
+    assert codes == set(range(100, 110))
+    with pytest.raises(InviteCodeError):
+        allocator.allocate()
+    allocator.release(105)
+    assert allocator.allocate() == 105
+
+
+def test_reserve_rejects_taken_and_foreign_codes():
+    allocator = InviteCodeAllocator(100, 199)
+    allocator.reserve(150)
+    with pytest.raises(InviteCodeError):
+        allocator.reserve(150)
+    with pytest.raises(InviteCodeError):
+        allocator.reserve(200)
+
+
+def test_shard_ranges_cover_code_space():
+    ranges = [get_shard_code_range(index, 3) for index in range(3)]
+    assert ranges[0][0] == MIN_INVITE_CODE
+    assert ranges[-1][1] == MAX_INVITE_CODE
+    for (_, previous_max), (next_min, _) in zip(ranges, ranges[1:]):
+        assert next_min == previous_max + 1
@@ -0,0 +1,32 @@
+from sqlalchemy import BigInteger, Boolean, Column, Integer, String
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from app.config import DATABASE_URL
+
+
+class Base(DeclarativeBase):
+    """Базовый класс для всех ORM-моделей"""
+    pass
+
+
+class GameRecord(Base):
+    __tablename__ = "games"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    main_user_id = Column(BigInteger, nullable=False)
+    user_ids = Column(ARRAY(BigInteger), nullable=False)
+    invite_code = Column(Integer, nullable=False)
+    is_started = Column(Boolean, nullable=False, default=False)
+    status = Column(String, nullable=False)
+
+
+engine = create_async_engine(DATABASE_URL)
+async_session = sessionmaker(
+    engine, class_=AsyncSession, expire_on_commit=False
+)
+
+async def init_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
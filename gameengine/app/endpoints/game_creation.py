@@ -1,30 +1,56 @@
 from fastapi import APIRouter, Depends, HTTPException
-from app.models import GameCreate, GameResponse, JoinCreate, InputItem, UserItem
+from fastapi.responses import StreamingResponse
+from app.models import GameCreate, GameResponse, JoinCreate, InputItem, UserItem, UserGameResponse, BatchRequest, BatchResult
 from app.dependencies import get_game_id
 from app.GamesEngine.Games import GamesEngine
-from app.error.error import AccessError, GameAmountError, IsNotConnectedError, NotHostError
+from app.GamesEngine.storage import create_storage
+from app.config import (
+    GAME_ENGINE_SHARD_INDEX,
+    GAME_ENGINE_SHARD_COUNT,
+    GAME_TTL_WAITING,
+    GAME_TTL_STARTED,
+    GAME_SWEEP_INTERVAL,
+    GAME_SWEEP_BATCH_SIZE
+)
+from app.GamesEngine.statuses import GameStatus
+from app.error.error import AccessError, GameAmountError, IsNotConnectedError, NotHostError, InviteCodeError
 import json
 
 router = APIRouter()
 
-games = GamesEngine()
+games = GamesEngine(
+    storage=create_storage(),
+    shard_index=GAME_ENGINE_SHARD_INDEX,
+    shard_count=GAME_ENGINE_SHARD_COUNT,
+    ttls={GameStatus.WAITING_FOR_USERS: GAME_TTL_WAITING, GameStatus.STARTED: GAME_TTL_STARTED},
+    sweep_interval=GAME_SWEEP_INTERVAL,
+    sweep_batch_size=GAME_SWEEP_BATCH_SIZE
+)
 
 @router.post("/create/", response_model=GameResponse, status_code=201)
 async def create_game(item: GameCreate):
-    invite_code = games.create_game(user_id = item.user_id, name=item.game)
+    try:
+        invite_code = games.create_game(user_id = item.user_id, name=item.game)
+    except GameAmountError as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    except InviteCodeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     return {"invite_code": invite_code}
 
+def get_error_status_code(error: ValueError) -> int:
+    # Все ошибки движка наследуются от ValueError, поэтому сначала частные случаи
+    if isinstance(error, (GameAmountError, NotHostError)):
+        return 406
+    if isinstance(error, InviteCodeError):
+        return 503
+    return 404
+
 @router.post("/join/", response_model=list[int])
 async def join_game(item: JoinCreate):
     try:
-        games.add_user(item.user_id, item.invite_code)
-        ids = games.get_user_ids(user_id = item.user_id)
-        ids.remove(item.user_id)
-        return ids
+        return games.join_game(item.user_id, item.invite_code)
     except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
-    except GameAmountError as e:
-        raise HTTPException(status_code=406, detail=str(e))
+        raise HTTPException(status_code=get_error_status_code(e), detail=str(e))
 
 @router.post("/start/", response_model=list[int])
 async def start_game(item: InputItem):
@@ -34,3 +60,46 @@ async def start_game(item: InputItem):
         raise HTTPException(status_code=404, detail="Not connected")
     except NotHostError:
         raise HTTPException(status_code=406, detail="Not host")
+
+@router.post("/batch/", response_model=list[BatchResult])
+async def batch(item: BatchRequest):
+    """Applies create/join/leave/start operations in order with a result per operation"""
+    results = []
+    for operation, (result, error) in zip(item.operations, games.apply_batch(item.operations)):
+        if error is not None:
+            results.append({"status_code": get_error_status_code(error), "detail": str(error)})
+        elif operation.op == "create":
+            results.append({"status_code": 201, "invite_code": result})
+        elif operation.op == "leave":
+            results.append({"status_code": 200})
+        else:
+            results.append({"status_code": 200, "user_ids": result})
+    return results
+
+@router.get("/events/{invite_code}/")
+async def game_events(invite_code: int):
+    """Server-Sent Events stream of lobby events for the game"""
+    game = games.get_game_by_invite_code(invite_code)
+    if game is None:
+        raise HTTPException(status_code=404, detail="Invalid Invite Code")
+
+    async def event_stream():
+        async for event in games.stream_events(game):
+            if event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@router.get("/users/{user_id}/", response_model=UserGameResponse)
+async def get_user_game(user_id: int):
+    """Игра, в которой сейчас состоит пользователь. По ней gateway находит шард пользователя"""
+    game = games.get_game(user_id)
+    if game is None:
+        raise HTTPException(status_code=404, detail="Not connected")
+    return {"game_id": game.get_id(), "invite_code": game.get_invite_code()}
+
+@router.get("/stats/")
+async def get_stats():
+    return games.get_stats()
@@ -8,4 +8,7 @@ class NotHostError(ValueError):
     pass
 
 class IsNotConnectedError(ValueError):
+    pass
+
+class InviteCodeError(ValueError):
     pass
\ No newline at end of file
@@ -1,17 +1,40 @@
 from fastapi import FastAPI, Depends
+from prometheus_fastapi_instrumentator import Instrumentator
 from app.endpoints import game_creation
+from app.tracing import setup_tracing
 
 app = FastAPI(
     title="GameEngine",
     version="0.1.0"
 )
 
+# Prometheus metrics: per-route counts, latency histograms and in-flight gauge at /metrics
+Instrumentator(
+    should_instrument_requests_inprogress=True,
+    inprogress_labels=True,
+    excluded_handlers=["/metrics"]
+).instrument(app).expose(app, include_in_schema=False)
+
+if setup_tracing("gameengine"):
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+
+    # Continues traces started by the gateway or the bot via traceparent
+    FastAPIInstrumentor.instrument_app(app, excluded_urls="health,metrics")
+
 app.include_router(
     game_creation.router,
     prefix="/api/v1",
     tags=["game"]
 )
 
+@app.on_event("startup")
+async def startup_event():
+    await game_creation.games.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await game_creation.games.stop()
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
\ No newline at end of file
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
+from typing import Literal, Optional
 import base64
 
 class InputItem(BaseModel):
@@ -21,4 +22,29 @@ class GameState(BaseModel):
 class UserItem(BaseModel):
     user_id : int
 
+class UserGameResponse(BaseModel):
+    game_id : int
+    invite_code : int
+
+
+class BatchOperation(InputItem):
+    op : Literal["create", "join", "leave", "start"]
+    game : Optional[str] = None
+    invite_code : Optional[int] = None
+
+    @model_validator(mode="after")
+    def check_required_fields(self):
+        if self.op == "create" and self.game is None:
+            raise ValueError("game is required for create")
+        if self.op == "join" and self.invite_code is None:
+            raise ValueError("invite_code is required for join")
+        return self
+
+class BatchRequest(BaseModel):
+    operations : list[BatchOperation]
 
+class BatchResult(BaseModel):
+    status_code : int
+    invite_code : Optional[int] = None
+    user_ids : Optional[list[int]] = None
+    detail : Optional[str] = None
@@ -1,4 +1,5 @@
 from fastapi import FastAPI
+from prometheus_fastapi_instrumentator import Instrumentator
 from app.endpoints import notifications
 
 app = FastAPI(
@@ -7,6 +8,13 @@ app = FastAPI(
     description="Microservice for sending notifications"
 )
 
+# Prometheus metrics: per-route counts, latency histograms and in-flight gauge at /metrics
+Instrumentator(
+    should_instrument_requests_inprogress=True,
+    inprogress_labels=True,
+    excluded_handlers=["/metrics"]
+).instrument(app).expose(app, include_in_schema=False)
+
 app.include_router(
     notifications.router,
     prefix="/api/v1/notifications",
@@ -0,0 +1,20 @@
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
+
+from config import DATABASE_URL
+
+
+class Base(DeclarativeBase):
+    """Базовый класс для всех ORM-моделей"""
+    pass
+
+
+engine = create_async_engine(DATABASE_URL)
+async_session = sessionmaker(
+    engine, class_=AsyncSession, expire_on_commit=False
+)
+
+async def init_db():
+    import database.models  # регистрирует таблицы в Base.metadata
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
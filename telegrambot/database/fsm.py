@@ -0,0 +1,155 @@
+import asyncio
+import copy
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StorageKey, StateType
+from aiogram.fsm.storage.memory import MemoryStorage
+from loguru import logger
+
+from config import DATABASE_URL, FSM_STORAGE, FSM_CACHE_SIZE
+
+NOTIFY_CHANNEL = "bot_fsm"
+
+
+class PostgresStorage(BaseStorage):
+    """
+    Хранилище FSM в Postgres с write-through кэшем в памяти: запись сразу
+    идет в базу и в кэш, чтение обслуживается из кэша. Каждая запись
+    отправляет NOTIFY, и остальные реплики бота выбрасывают свою копию
+    ключа. Пока LISTEN-соединение не установлено, кэш не используется
+    для чтения, чтобы не отдать чужое устаревшее состояние.
+    """
+    def __init__(self, cache_size : int = FSM_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.instance_id = uuid.uuid4().hex
+        self._cache = OrderedDict()  # key -> (state, data)
+        self._invalidations = 0
+        self._listening = False
+        self._task = None
+
+    async def start(self):
+        from database.db import init_db
+        await init_db()
+        self._task = asyncio.create_task(self._listen())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @staticmethod
+    def _make_key(key : StorageKey) -> str:
+        return ":".join(str(part) for part in (
+            key.bot_id, key.chat_id, key.user_id, key.thread_id, key.business_connection_id, key.destiny
+        ))
+
+    def _remember(self, key : str, entry : tuple):
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _load(self, key : str) -> tuple[Optional[str], Dict[str, Any]]:
+        if self._listening and key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        from database.db import async_session
+        from database.models import FsmRecord
+
+        invalidations = self._invalidations
+        async with async_session() as session:
+            record = await session.get(FsmRecord, key)
+        entry = (record.state, record.data) if record is not None else (None, {})
+        # Если во время чтения пришло уведомление, прочитанное могло устареть
+        if invalidations == self._invalidations:
+            self._remember(key, entry)
+        return entry
+
+    async def _save(self, key : str, column : str, value):
+        """
+        Пишет только изменяемую колонку (state или data), поэтому запись
+        другой колонки с другой реплики не затирается. В кэш попадает
+        строка, которую вернул upsert.
+        """
+        from sqlalchemy import delete, func, select
+        from sqlalchemy.dialects.postgresql import insert
+        from database.db import async_session
+        from database.models import FsmRecord
+
+        invalidations = self._invalidations
+        async with async_session.begin() as session:
+            statement = insert(FsmRecord).values(**{"key": key, "state": None, "data": {}, column: value})
+            result = await session.execute(statement.on_conflict_do_update(
+                index_elements=[FsmRecord.key],
+                set_={column: statement.excluded[column]}
+            ).returning(FsmRecord.state, FsmRecord.data))
+            state, data = result.one()
+            if state is None and not data:
+                # Строка заблокирована upsert до коммита, удалять пустую безопасно
+                await session.execute(delete(FsmRecord).where(FsmRecord.key == key))
+            # NOTIFY доставляется только после коммита
+            await session.execute(select(func.pg_notify(NOTIFY_CHANNEL, f"{self.instance_id}:{key}")))
+        # Уведомление о более новой записи с другой реплики могло прийти
+        # во время коммита: тогда наше значение уже устарело
+        if invalidations == self._invalidations:
+            self._remember(key, (state, data))
+        else:
+            self._cache.pop(key, None)
+
+    async def set_state(self, key : StorageKey, state : StateType = None) -> None:
+        await self._save(self._make_key(key), "state", state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key : StorageKey) -> Optional[str]:
+        state, _ = await self._load(self._make_key(key))
+        return state
+
+    async def set_data(self, key : StorageKey, data : Dict[str, Any]) -> None:
+        await self._save(self._make_key(key), "data", copy.deepcopy(data))
+
+    async def get_data(self, key : StorageKey) -> Dict[str, Any]:
+        _, data = await self._load(self._make_key(key))
+        return copy.deepcopy(data)
+
+    def _on_notify(self, connection, pid, channel, payload : str):
+        instance_id, _, key = payload.partition(":")
+        if instance_id != self.instance_id:
+            self._invalidations += 1
+            self._cache.pop(key, None)
+
+    async def _listen(self):
+        import asyncpg
+
+        dsn = DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
+        while True:
+            try:
+                connection = await asyncpg.connect(dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(NOTIFY_CHANNEL, self._on_notify)
+                # Пока уведомления не приходили, другие реплики могли изменить состояния
+                self._cache.clear()
+                self._listening = True
+                try:
+                    await closed.wait()
+                finally:
+                    self._listening = False
+                    await connection.close()
+            except Exception as e:
+                logger.error(f"FSM storage listener failed: {e}")
+            await asyncio.sleep(1)
+
+
+def create_fsm_storage(kind : str = FSM_STORAGE) -> BaseStorage:
+    if kind == "postgres":
+        return PostgresStorage()
+    if kind == "memory":
+        return MemoryStorage()
+    raise ValueError(f"Unknown FSM storage: {kind}")
@@ -0,0 +1,41 @@
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, ForeignKey, Integer, String, Text, false
+from sqlalchemy.dialects.postgresql import JSONB
+
+from database.db import Base
+
+
+class User(Base):
+    __tablename__ = "bot_users"
+
+    id = Column(Integer, primary_key=True)
+    telegram_id = Column(BigInteger, nullable=False, unique=True)
+    username = Column(String, nullable=True)
+    last_activity = Column(DateTime, nullable=False)
+    is_admin = Column(Boolean, nullable=False, default=False, server_default=false())
+
+
+class Event(Base):
+    __tablename__ = "bot_events"
+
+    id = Column(Integer, primary_key=True)
+    event_type = Column(String, nullable=False)
+    details = Column(JSONB, nullable=False)
+    user_id = Column(Integer, ForeignKey("bot_users.id"), nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False)
+
+
+class Message(Base):
+    __tablename__ = "bot_messages"
+
+    id = Column(Integer, primary_key=True)
+    text = Column(Text, nullable=True)
+    user_id = Column(Integer, ForeignKey("bot_users.id"), nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False)
+
+
+class FsmRecord(Base):
+    __tablename__ = "bot_fsm"
+
+    key = Column(String, primary_key=True)
+    state = Column(String, nullable=True)
+    data = Column(JSONB, nullable=False)
@@ -0,0 +1,129 @@
+import asyncio
+
+from loguru import logger
+
+from config import DB_WRITE_QUEUE_SIZE, DB_WRITE_BATCH_SIZE, DB_WRITE_FLUSH_INTERVAL
+
+
+class DatabaseWriter():
+    """
+    Фоновая запись активности пользователей. Middleware кладет записи в
+    ограниченную очередь, задача забирает их пачками (batch_size записей
+    или все, что пришло за flush_interval) и пишет одной транзакцией:
+    upsert пользователей, затем события и сообщения. Если база не успевает,
+    очередь заполняется и put ждет свободного места - это и есть обратное
+    давление на обработчики.
+    """
+    def __init__(self, queue_size : int = DB_WRITE_QUEUE_SIZE, batch_size : int = DB_WRITE_BATCH_SIZE,
+                 flush_interval : float = DB_WRITE_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._task = None
+
+    async def start(self):
+        from database.db import init_db
+        await init_db()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        # None в конце очереди: задача дописывает все, что было до него, и завершается
+        await self.queue.put(None)
+        await self._task
+        self._task = None
+
+    async def put(self, record : dict):
+        await self.queue.put(record)
+
+    async def _next_batch(self) -> tuple[list[dict], bool]:
+        record = await self.queue.get()
+        if record is None:
+            return [], True
+        batch = [record]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if self.queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                record = self.queue.get_nowait()
+            if record is None:
+                return batch, True
+            batch.append(record)
+        return batch, False
+
+    async def _flush_loop(self):
+        stopped = False
+        while not stopped:
+            batch, stopped = await self._next_batch()
+            if not batch:
+                continue
+            try:
+                await self.flush(batch)
+            except Exception as e:
+                # Журнал активности не критичен: пачка отбрасывается, чтобы не копить очередь
+                self.dropped += len(batch)
+                logger.error(f"Database write of {len(batch)} records failed: {e}")
+
+    async def flush(self, batch : list[dict]):
+        from sqlalchemy.dialects.postgresql import insert
+        from database.db import async_session
+        from database.models import User, Event, Message
+
+        # Последняя запись о пользователе в пачке содержит актуальные данные
+        users = {}
+        for record in batch:
+            users[record["telegram_id"]] = {
+                "telegram_id": record["telegram_id"],
+                "username": record["username"],
+                "last_activity": record["created_at"],
+            }
+
+        async with async_session.begin() as session:
+            statement = insert(User).values(list(users.values()))
+            result = await session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[User.telegram_id],
+                    set_={
+                        "username": statement.excluded.username,
+                        "last_activity": statement.excluded.last_activity,
+                    }
+                ).returning(User.id, User.telegram_id)
+            )
+            user_ids = {telegram_id: user_id for user_id, telegram_id in result.all()}
+
+            events = [
+                {
+                    "event_type": record["event_type"],
+                    "details": record["details"],
+                    "user_id": user_ids[record["telegram_id"]],
+                    "created_at": record["created_at"],
+                }
+                for record in batch
+            ]
+            await session.execute(insert(Event), events)
+
+            messages = [
+                {
+                    "text": record["message_text"],
+                    "user_id": user_ids[record["telegram_id"]],
+                    "created_at": record["message_date"],
+                }
+                for record in batch if record.get("message_date") is not None
+            ]
+            if messages:
+                await session.execute(insert(Message), messages)
+        logger.debug(f"Flushed {len(batch)} records ({len(users)} users, {len(messages)} messages)")
+
+    def get_stats(self) -> dict:
+        return {"queued": self.queue.qsize(), "dropped": self.dropped}
+
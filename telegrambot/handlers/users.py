@@ -7,6 +7,7 @@ from aiogram.fsm.context import FSMContext
 from utils.keyboard import start_keyboard, games_keyboard, game_start_keyboard
 from utils.buttons import create_button, join_button, games_buttons, start_button
 from utils.texts import start_text, games_placeholder, join_text, game_creation_text, success_join, game_is_starting, user_joined_text
+from utils.profiles import profile_cache
 from utils.utils import create_game, join_game, check_button, send_seq_messages, start_game
 
 router = Router()
@@ -43,7 +44,11 @@ async def create(message : Message, bot : Bot, state: FSMContext):
 @router.message(lambda message: message.text and message.text in games_buttons)
 async def game_creation(message : Message, bot : Bot, state: FSMContext):
     user_id = message.from_user.id
-    invite_code = create_game(user_id, message.text)
+    try:
+        invite_code = await create_game(user_id, message.text)
+    except ValueError as err:
+        await message.reply(str(err))
+        return
 
     await message.reply(f"{game_creation_text} {invite_code}", reply_markup=game_start_keyboard(user_id))
     await state.set_state(UserStates.InGame)
@@ -52,7 +57,8 @@ async def game_creation(message : Message, bot : Bot, state: FSMContext):
 async def games_joining(message : Message, bot : Bot, state: FSMContext):
     user_id = message.from_user.id
     try:
-        ids = join_game(user_id, message.text)
+        ids = await join_game(user_id, message.text)
+        profile_cache.schedule_prefetch(ids)
         await send_seq_messages(bot, ids, f"{user_joined_text} {message.from_user.username}")
     except ValueError as err:
         await message.reply(str(err))
@@ -64,7 +70,8 @@ async def games_joining(message : Message, bot : Bot, state: FSMContext):
 async def start_game_handler(message : Message, bot : Bot, state: FSMContext):
     user_id = message.from_user.id
     try:
-        ids = start_game(user_id)
+        ids = await start_game(user_id)
+        profile_cache.schedule_prefetch(ids)
         await send_seq_messages(bot, ids, game_is_starting, reply_markup=ReplyKeyboardRemove())
     except ValueError as err:
         await message.reply(str(err))
@@ -1,24 +1,57 @@
 import asyncio
 
 from aiogram import Bot, Dispatcher
-# from middlewares.database import DatabaseMiddleware # Надо потом переписать класс под новую структуру
-from config import TOKEN
+from config import TOKEN, DB_LOGGING_ENABLED, BOT_MODE, FSM_STORAGE
+from database.fsm import create_fsm_storage
+from database.writer import DatabaseWriter
 from handlers import admin, users
+from middleware.database import DatabaseMiddleware
+from middleware.profiles import ProfileMiddleware
+from middleware.tracing import TracingMiddleware
+from utils.tracing import setup_tracing
+from utils.http import start_http_client, close_http_client
+from utils.webhook import run_webhook
 
 bot = Bot(token=TOKEN)
-dp = Dispatcher()
+storage = create_fsm_storage()
+dp = Dispatcher(storage=storage)
 
 async def main():
-    # dp.update.middleware(DatabaseMiddleware())
+    if setup_tracing("telegrambot"):
+        from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+
+        # Передает traceparent в запросах к gameengine
+        HTTPXClientInstrumentor().instrument()
+        dp.update.outer_middleware(TracingMiddleware())
 
     routers = (admin.router, users.router)
     for router in routers:
         dp.include_router(router)
 
-    await dp.start_polling(
-            bot,
-            allowed_updates=dp.resolve_used_update_types()
-    )
+    writer = None
+    if DB_LOGGING_ENABLED:
+        writer = DatabaseWriter()
+        await writer.start()
+        dp.update.middleware(DatabaseMiddleware(writer))
+    dp.update.middleware(ProfileMiddleware())
+
+    if FSM_STORAGE == "postgres":
+        await storage.start()
+
+    await start_http_client()
+    try:
+        if BOT_MODE == "webhook":
+            await run_webhook(dp, bot)
+        else:
+            await dp.start_polling(
+                    bot,
+                    allowed_updates=dp.resolve_used_update_types()
+            )
+    finally:
+        await close_http_client()
+        await storage.close()
+        if writer is not None:
+            await writer.stop()
 
 
 
@@ -0,0 +1,19 @@
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from typing import Any, Dict, Callable, Awaitable
+
+from utils.profiles import profile_cache
+
+
+class ProfileMiddleware(BaseMiddleware):
+    """Загружает профиль автора события до обработчика, чтобы клавиатуры брали его из кэша"""
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is not None:
+            await profile_cache.get(user.id)
+        return await handler(event, data)
@@ -0,0 +1,22 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from opentelemetry import trace
+
+tracer = trace.get_tracer(__name__)
+
+
+class TracingMiddleware(BaseMiddleware):
+    """Корневой спан на каждый апдейт: запросы хендлера к сервисам становятся его детьми"""
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        event_type = event.event_type if isinstance(event, Update) else event.__class__.__name__
+        with tracer.start_as_current_span(f"telegram {event_type}") as span:
+            if isinstance(event, Update):
+                span.set_attribute("telegram.update_id", event.update_id)
+            return await handler(event, data)
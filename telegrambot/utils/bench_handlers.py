@@ -0,0 +1,176 @@
+"""
+Нагрузочный тест обработчиков бота:
+python -m utils.bench_handlers [--updates N] [--concurrency C] [--engine-delay MS]
+
+Настоящий Dispatcher с роутером users и ProfileMiddleware получает N апдейтов
+"создать игру" от разных пользователей, не больше --concurrency одновременно
+(polling с handle_as_tasks запускает так пачку getUpdates). Telegram заменен FakeTelegramSession, gameengine - заглушкой
+на aiohttp в отдельном потоке. Сравниваются общий async-клиент из
+utils.http и синхронный HTTP-вызов внутри обработчика, как было раньше.
+"""
+import argparse
+import asyncio
+import itertools
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+import httpx
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import GetMe, GetUpdates, SendMessage
+from aiogram.types import Chat, Message, Update, User
+
+from config import HTTP_TIMEOUT
+from utils import http, utils
+from utils.buttons import monopoly_button
+
+BENCH_TOKEN = "42:BENCH"
+
+
+class FakeTelegramSession(BaseSession):
+    """
+    Bot API без сети: getUpdates отдает заранее подготовленные апдейты,
+    sendMessage возвращает сообщение, остальные методы - True.
+    get_updates_delay - время ответа getUpdates, как сетевой round trip до Telegram
+    """
+    def __init__(self, updates : list[Update] = (), get_updates_delay : float = 0):
+        super().__init__()
+        self.pending = deque(updates)
+        self.get_updates_delay = get_updates_delay
+        self.calls = Counter()
+
+    async def make_request(self, bot : Bot, method, timeout : int = None):
+        self.calls[type(method).__name__] += 1
+        if isinstance(method, GetUpdates):
+            if self.get_updates_delay:
+                await asyncio.sleep(self.get_updates_delay)
+            if not self.pending:
+                # Long polling без новых апдейтов
+                await asyncio.sleep(0.01)
+            return [self.pending.popleft() for _ in range(min(len(self.pending), method.limit or 100))]
+        if isinstance(method, GetMe):
+            return User(id=42, is_bot=True, first_name="bench", username="bench_bot")
+        if isinstance(method, SendMessage):
+            return Message(
+                message_id=1, date=datetime.now(), text=method.text,
+                chat=Chat(id=method.chat_id, type="private")
+            )
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        raise NotImplementedError
+        yield b""
+
+    async def close(self):
+        pass
+
+
+def make_message_update(update_id : int, user_id : int, text : str) -> Update:
+    return Update(update_id=update_id, message=Message(
+        message_id=update_id, date=datetime.now(), text=text,
+        chat=Chat(id=user_id, type="private"),
+        from_user=User(id=user_id, is_bot=False, first_name="player", username=f"player{user_id}")
+    ))
+
+
+def start_stub_engine(port : int, delay : float):
+    """Заглушка gameengine в своем потоке и event loop: синхронный клиент не должен ее блокировать"""
+    codes = itertools.count(100000)
+
+    async def create(request : web.Request) -> web.Response:
+        await asyncio.sleep(delay)
+        return web.json_response({"invite_code": next(codes)}, status=201)
+
+    app = web.Application()
+    app.router.add_post("/api/v1/create/", create)
+    started = threading.Event()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+
+
+def create_dispatcher() -> Dispatcher:
+    from handlers import users
+    from middleware.profiles import ProfileMiddleware
+
+    dp = Dispatcher(storage=MemoryStorage())
+    dp.include_router(users.router)
+    dp.update.middleware(ProfileMiddleware())
+    return dp
+
+
+async def run_mode(dp : Dispatcher, blocking : bool, updates_count : int, concurrency : int,
+                   first_user_id : int) -> dict:
+    session = FakeTelegramSession()
+    bot = Bot(token=BENCH_TOKEN, session=session)
+    updates = [
+        make_message_update(index, first_user_id + index, monopoly_button) for index in range(updates_count)
+    ]
+
+    post = utils.post
+    sync_client = httpx.Client(timeout=HTTP_TIMEOUT)
+    if blocking:
+        async def blocking_post(url : str, payload : dict) -> httpx.Response:
+            return sync_client.post(url, json=payload)
+        utils.post = blocking_post
+    slots = asyncio.Semaphore(concurrency)
+
+    async def feed(update : Update):
+        async with slots:
+            await dp.feed_update(bot, update)
+
+    await http.start_http_client()
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(feed(update) for update in updates))
+        elapsed = time.perf_counter() - started
+    finally:
+        utils.post = post
+        sync_client.close()
+        await http.close_http_client()
+    return {
+        "mode": "blocking" if blocking else "async",
+        "updates_per_second": updates_count / elapsed,
+        "replies": session.calls["SendMessage"],
+    }
+
+
+async def bench(args):
+    start_stub_engine(args.engine_port, args.engine_delay / 1000)
+    utils.game_engine_url = f"http://127.0.0.1:{args.engine_port}/api/v1"
+    # Роутер users - модульный синглтон, его можно подключить только к одному Dispatcher
+    dp = create_dispatcher()
+    results = [
+        await run_mode(dp, True, args.updates, args.concurrency, 1),
+        await run_mode(dp, False, args.updates, args.concurrency, args.updates + 1),
+    ]
+    print(f"{args.updates} create-game updates, {args.concurrency} at a time, "
+          f"gameengine latency {args.engine_delay:.0f} ms")
+    for result in results:
+        print(f"{result['mode']:<9} {result['updates_per_second']:>8.0f} updates/s  replies={result['replies']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Updates/sec of the bot handlers against a stub gameengine")
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--engine-delay", type=float, default=20, help="задержка заглушки gameengine, мс")
+    parser.add_argument("--engine-port", type=int, default=18100)
+    asyncio.run(bench(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
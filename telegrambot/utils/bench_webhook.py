@@ -0,0 +1,150 @@
+"""
+Пропускная способность режимов получения апдейтов:
+python -m utils.bench_webhook [--updates N] [--chats C] [--handler-delay MS]
+
+Один и тот же обработчик (sleep на --handler-delay +-50%, как поход в gameengine)
+получает N апдейтов из C чатов тремя способами:
+  serial  - по одному апдейту, как обработка без параллелизма;
+  polling - dp.start_polling с handle_as_tasks, getUpdates отдает
+            FakeTelegramSession пачками по 100 с задержкой --telegram-rtt;
+  webhook - aiohttp-сервер из utils.webhook с UpdateWorkerPool, апдейты
+            шлет фейковый Telegram по --connections соединениям.
+Для каждого режима выводятся апдейты в секунду и сохранился ли порядок
+апдейтов внутри каждого чата.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import aiohttp
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+
+from config import WEBHOOK_PATH, WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE
+from utils.bench_handlers import BENCH_TOKEN, FakeTelegramSession, make_message_update
+from utils.webhook import create_webhook_app
+from utils.workers import UpdateWorkerPool
+
+
+class Recorder():
+    """Обработчик бенчмарка: ждет около handler_delay и запоминает порядок апдейтов по чатам"""
+    def __init__(self, handler_delay : float, rng : random.Random):
+        self.handler_delay = handler_delay
+        self.rng = rng
+        self.seen = {}
+        self.done = asyncio.Event()
+        self.expected = 0
+
+    def reset(self, expected : int):
+        self.seen = {}
+        self.done = asyncio.Event()
+        self.expected = expected
+
+    async def handle(self, message : Message):
+        await asyncio.sleep(self.handler_delay * self.rng.uniform(0.5, 1.5))
+        self.seen.setdefault(message.chat.id, []).append(message.message_id)
+        if sum(len(ids) for ids in self.seen.values()) == self.expected:
+            self.done.set()
+
+    def is_ordered(self) -> bool:
+        return all(ids == sorted(ids) for ids in self.seen.values())
+
+
+def create_dispatcher(recorder : Recorder) -> Dispatcher:
+    router = Router()
+    router.message.register(recorder.handle)
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+async def run_serial(dp : Dispatcher, updates : list) -> None:
+    bot = Bot(token=BENCH_TOKEN, session=FakeTelegramSession())
+    for update in updates:
+        await dp.feed_update(bot, update)
+
+
+async def run_polling(dp : Dispatcher, updates : list, recorder : Recorder, rtt : float) -> None:
+    bot = Bot(token=BENCH_TOKEN, session=FakeTelegramSession(updates, get_updates_delay=rtt))
+
+    async def stop_when_done():
+        await recorder.done.wait()
+        await dp.stop_polling()
+
+    stopper = asyncio.create_task(stop_when_done())
+    await dp.start_polling(bot, handle_as_tasks=True, handle_signals=False, close_bot_session=False)
+    await stopper
+
+
+async def run_webhook(dp : Dispatcher, updates : list, recorder : Recorder, port : int, connections : int) -> None:
+    from aiohttp import web
+
+    bot = Bot(token=BENCH_TOKEN, session=FakeTelegramSession())
+    pool = UpdateWorkerPool(lambda update: dp.feed_update(bot, update), WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE)
+    pool.start()
+    runner = web.AppRunner(create_webhook_app(dp, bot, pool))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+
+    # Апдейты одного чата фейковый Telegram шлет по одному соединению по порядку
+    streams = [[] for _ in range(connections)]
+    for update in updates:
+        streams[update.message.chat.id % connections].append(update)
+    url = f"http://127.0.0.1:{port}{WEBHOOK_PATH}"
+
+    try:
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=connections)) as session:
+            async def send(stream : list):
+                for update in stream:
+                    payload = update.model_dump(mode="json", exclude_none=True)
+                    async with session.post(url, json=payload) as response:
+                        response.raise_for_status()
+
+            await asyncio.gather(*(send(stream) for stream in streams))
+            await recorder.done.wait()
+    finally:
+        await runner.cleanup()
+        await pool.stop()
+
+
+async def bench(args):
+    rng = random.Random(args.seed)
+    updates = [
+        make_message_update(index, rng.randrange(1, args.chats + 1), "bench")
+        for index in range(1, args.updates + 1)
+    ]
+    recorder = Recorder(args.handler_delay / 1000, rng)
+    dp = create_dispatcher(recorder)
+
+    modes = {
+        "serial": lambda: run_serial(dp, updates[:args.serial_updates]),
+        "polling": lambda: run_polling(dp, updates, recorder, args.telegram_rtt / 1000),
+        "webhook": lambda: run_webhook(dp, updates, recorder, args.port, args.connections),
+    }
+    print(f"{args.updates} updates from {args.chats} chats, handler {args.handler_delay:.0f} ms, "
+          f"getUpdates round trip {args.telegram_rtt:.0f} ms, {WEBHOOK_WORKERS} webhook workers")
+    for mode, run in modes.items():
+        count = args.serial_updates if mode == "serial" else args.updates
+        recorder.reset(count)
+        started = time.perf_counter()
+        await run()
+        elapsed = time.perf_counter() - started
+        print(f"{mode:<8} {count / elapsed:>8.0f} updates/s  ordered per chat: {recorder.is_ordered()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Updates/sec of serial handling, polling and the webhook pool")
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--serial-updates", type=int, default=300, help="апдейтов в медленном режиме serial")
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--handler-delay", type=float, default=10, help="время обработчика, мс")
+    parser.add_argument("--telegram-rtt", type=float, default=50, help="задержка ответа getUpdates, мс")
+    parser.add_argument("--connections", type=int, default=40, help="соединений вебхука, как max_connections в Telegram")
+    parser.add_argument("--port", type=int, default=18200)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(bench(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramNetworkError, TelegramRetryAfter
+
+from config import BROADCAST_GLOBAL_RATE, BROADCAST_PER_CHAT_INTERVAL, BROADCAST_MAX_RETRIES
+
+# Когда словарь интервалов по чатам разрастается, из него удаляются прошедшие записи
+MAX_TRACKED_CHATS = 10000
+
+
+@dataclass
+class DeliveryResult:
+    chat_id : int
+    ok : bool
+    attempts : int
+    error : Optional[str] = None
+
+
+class Broadcaster():
+    """
+    Параллельная рассылка в пределах лимитов Telegram: не больше global_rate
+    сообщений в секунду на бота и одно сообщение в чат за per_chat_interval.
+    RetryAfter ставит на паузу все отправки бота, а не только одну.
+    """
+    def __init__(self, global_rate : float, per_chat_interval : float, max_retries : int):
+        self.global_interval = 1 / global_rate
+        self.per_chat_interval = per_chat_interval
+        self.max_retries = max_retries
+        self._next_global_slot = 0.0
+        self._next_chat_slot = {}
+        self._paused_until = 0.0
+
+    async def _wait_for_slot(self, chat_id : int):
+        # Слоты резервируются синхронно, поэтому параллельные отправки
+        # не занимают один и тот же слот
+        while True:
+            now = time.monotonic()
+            slot = max(now, self._paused_until, self._next_global_slot, self._next_chat_slot.get(chat_id, 0.0))
+            self._next_global_slot = max(self._next_global_slot, slot) + self.global_interval
+            self._next_chat_slot[chat_id] = slot + self.per_chat_interval
+            if len(self._next_chat_slot) > MAX_TRACKED_CHATS:
+                self._next_chat_slot = {
+                    chat: next_slot for chat, next_slot in self._next_chat_slot.items() if next_slot > now
+                }
+            if slot > now:
+                await asyncio.sleep(slot - now)
+            # Пока ждали слот, другая отправка могла получить RetryAfter:
+            # тогда слот резервируется заново, уже после паузы
+            if self._paused_until <= time.monotonic():
+                return
+
+    async def send_one(self, bot : Bot, chat_id : int, text : str, **kwargs) -> DeliveryResult:
+        attempts = 0
+        while True:
+            attempts += 1
+            await self._wait_for_slot(chat_id)
+            try:
+                await bot.send_message(chat_id, text, **kwargs)
+                return DeliveryResult(chat_id=chat_id, ok=True, attempts=attempts)
+            except TelegramRetryAfter as err:
+                self._paused_until = max(self._paused_until, time.monotonic() + err.retry_after)
+                error = err
+            except TelegramNetworkError as err:
+                await asyncio.sleep(min(2 ** attempts, 30) / 10)
+                error = err
+            except TelegramAPIError as err:
+                # Бот заблокирован, чат не найден и т.п. - повтор не поможет
+                return DeliveryResult(chat_id=chat_id, ok=False, attempts=attempts, error=str(err))
+            if attempts > self.max_retries:
+                return DeliveryResult(chat_id=chat_id, ok=False, attempts=attempts, error=str(error))
+
+    async def send(self, bot : Bot, chat_ids, text : str, **kwargs) -> list[DeliveryResult]:
+        return await asyncio.gather(*(self.send_one(bot, chat_id, text, **kwargs) for chat_id in chat_ids))
+
+
+broadcaster = Broadcaster(BROADCAST_GLOBAL_RATE, BROADCAST_PER_CHAT_INTERVAL, BROADCAST_MAX_RETRIES)
@@ -0,0 +1,30 @@
+import httpx
+
+from config import HTTP_TIMEOUT, HTTP_CONNECT_RETRIES, HTTP_MAX_CONNECTIONS
+
+# Общий пул соединений бота, создается при старте в main.py
+client : httpx.AsyncClient = None
+
+
+async def start_http_client():
+    global client
+    client = httpx.AsyncClient(
+        timeout=HTTP_TIMEOUT,
+        limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS),
+        # Повторяются только неудачные подключения, поэтому POST не выполнится дважды
+        transport=httpx.AsyncHTTPTransport(retries=HTTP_CONNECT_RETRIES)
+    )
+
+
+async def close_http_client():
+    global client
+    if client is not None:
+        await client.aclose()
+        client = None
+
+
+async def post(url : str, payload : dict) -> httpx.Response:
+    try:
+        return await client.post(url, json=payload)
+    except httpx.RequestError:
+        raise ValueError("Сервис временно недоступен, попробуйте позже")
@@ -0,0 +1,138 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterable, Optional
+
+from loguru import logger
+
+from config import DB_LOGGING_ENABLED, PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL, PROFILE_CACHE_NEGATIVE_TTL
+
+
+@dataclass(frozen=True)
+class Profile:
+    telegram_id : int
+    username : Optional[str]
+    is_admin : bool
+
+
+ProfileLoader = Callable[[list[int]], Awaitable[dict[int, Profile]]]
+
+
+class ProfileCache():
+    """
+    LRU-кэш профилей с TTL. Отсутствующие профили тоже кэшируются (на
+    negative_ttl), чтобы незнакомый пользователь не вызывал запрос на
+    каждое сообщение. peek никогда не ходит в базу - его используют
+    клавиатуры; загрузка идет через get, prefetch и schedule_prefetch.
+    Устаревшая запись отдается сразу и обновляется в фоне.
+    """
+    def __init__(self, loader : ProfileLoader, max_size : int = PROFILE_CACHE_SIZE,
+                 ttl : float = PROFILE_CACHE_TTL, negative_ttl : float = PROFILE_CACHE_NEGATIVE_TTL):
+        self.loader = loader
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # user_id -> (expires_at, Profile | None)
+        self._loading = {}  # user_id -> Future загрузки, чтобы не грузить одного пользователя дважды
+        self._tasks = set()
+
+    def peek(self, user_id : int) -> Optional[Profile]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        self._entries.move_to_end(user_id)
+        return entry[1]
+
+    async def get(self, user_id : int) -> Optional[Profile]:
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(user_id)
+            if entry[0] <= time.monotonic():
+                self.schedule_prefetch([user_id])
+            return entry[1]
+        self.misses += 1
+        await self.prefetch([user_id])
+        return self.peek(user_id)
+
+    async def prefetch(self, user_ids : Iterable[int]):
+        """Одним запросом загружает профили, которых нет в кэше или которые устарели"""
+        now = time.monotonic()
+        missing = []
+        waiting = set()
+        for user_id in set(user_ids):
+            if user_id in self._loading:
+                waiting.add(self._loading[user_id])
+                continue
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= now:
+                missing.append(user_id)
+
+        if missing:
+            loaded = asyncio.get_running_loop().create_future()
+            for user_id in missing:
+                self._loading[user_id] = loaded
+            try:
+                self._store(missing, await self.loader(missing))
+            except Exception as e:
+                # Старые записи остаются в кэше, следующий запрос повторит загрузку
+                logger.error(f"Profile lookup for {len(missing)} users failed: {e}")
+            finally:
+                for user_id in missing:
+                    self._loading.pop(user_id, None)
+                loaded.set_result(None)
+
+        if waiting:
+            await asyncio.gather(*waiting)
+
+    def schedule_prefetch(self, user_ids : Iterable[int]):
+        """prefetch в фоне, не задерживая обработчик"""
+        task = asyncio.create_task(self.prefetch(list(user_ids)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _store(self, user_ids : list[int], profiles : dict[int, Profile]):
+        now = time.monotonic()
+        for user_id in user_ids:
+            profile = profiles.get(user_id)
+            ttl = self.ttl if profile is not None else self.negative_ttl
+            self._entries[user_id] = (now + ttl, profile)
+            self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *user_ids : int):
+        """Вызывается при изменении профиля или роли, следующий get загрузит их заново"""
+        for user_id in user_ids:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+async def load_profiles_from_database(user_ids : list[int]) -> dict[int, Profile]:
+    from sqlalchemy import select
+    from database.db import async_session
+    from database.models import User
+
+    async with async_session() as session:
+        result = await session.execute(
+            select(User.telegram_id, User.username, User.is_admin).where(User.telegram_id.in_(user_ids))
+        )
+        return {
+            telegram_id: Profile(telegram_id=telegram_id, username=username, is_admin=is_admin)
+            for telegram_id, username, is_admin in result.all()
+        }
+
+
+async def load_no_profiles(user_ids : list[int]) -> dict[int, Profile]:
+    return {}
+
+
+profile_cache = ProfileCache(load_profiles_from_database if DB_LOGGING_ENABLED else load_no_profiles)
@@ -0,0 +1,21 @@
+import sys
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+from config import TRACING_ENABLED, TRACING_FILE
+
+
+def setup_tracing(service_name : str) -> bool:
+    if not TRACING_ENABLED:
+        return False
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    out = open(TRACING_FILE, "a") if TRACING_FILE else sys.stdout
+    provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter(
+        out=out,
+        formatter=lambda span: span.to_json(indent=None) + "\n"
+    )))
+    trace.set_tracer_provider(provider)
+    return True
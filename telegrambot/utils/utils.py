@@ -1,21 +1,27 @@
-import requests
+from utils.broadcast import broadcaster
+from utils.http import post
+from utils.profiles import profile_cache
 from utils.urls import databaseinterface_url, game_engine_url
 
 def is_admin(user_id):
-    return False #Пока не реализован database_interface
+    # Только кэш, без запросов: профиль заранее загружает ProfileMiddleware
+    profile = profile_cache.peek(user_id)
+    return profile is not None and profile.is_admin
 
 
-def create_game(user_id, name):
+async def create_game(user_id, name):
     payload = {"user_id" : user_id, "game" : name}
-    response = requests.post(f"{game_engine_url}/create", json = payload)
-    if response.status_code != 200:
-        pass
+    response = await post(f"{game_engine_url}/create/", payload)
+    if response.status_code == 406:
+        raise ValueError("Вы уже присоединены к другой игре")
+    elif response.status_code == 503:
+        raise ValueError("Сейчас нет свободных комнат, попробуйте позже")
     return response.json()['invite_code']
 
-def join_game(user_id, invite_code):
+async def join_game(user_id, invite_code):
     payload = {"user_id" : user_id, "invite_code" : invite_code}
-    response = requests.post(f"{game_engine_url}/join", json = payload)
-    if response.status_code == 404:
+    response = await post(f"{game_engine_url}/join/", payload)
+    if response.status_code in (404, 422):
         raise ValueError("Такого кода приглашения не существует")
     elif response.status_code == 406:
         raise ValueError("Вы уже присоединены к другой игре")
@@ -25,9 +31,9 @@ def join_game(user_id, invite_code):
 def check_button(button : str, list_buttons : list):
     return bool(button in list_buttons)
 
-def start_game(user_id):
+async def start_game(user_id):
     payload = {"user_id" : user_id}
-    response = requests.post(f"{game_engine_url}/start", json = payload)
+    response = await post(f"{game_engine_url}/start/", payload)
     if response.status_code == 404:
         raise ValueError("Вы не присоединены ни к одной игре")
     elif response.status_code == 406:
@@ -36,7 +42,7 @@ def start_game(user_id):
 
 
 async def send_seq_messages(bot, user_ids, message, **kwargs):
-    for id in user_ids:
-        await bot.send_message(id, message, **kwargs)
+    """Рассылка через общий broadcaster; возвращает результат доставки по каждому получателю"""
+    return await broadcaster.send(bot, user_ids, message, **kwargs)
 
 
@@ -0,0 +1,73 @@
+import asyncio
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from loguru import logger
+from pydantic import ValidationError
+
+from config import (
+    WEBHOOK_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_WORKERS,
+    WEBHOOK_QUEUE_SIZE
+)
+from utils.workers import UpdateWorkerPool
+
+
+def get_chat_key(update : Update) -> int:
+    """Ключ порядка обработки: чат события, иначе его автор"""
+    event = update.event
+    chat = getattr(event, "chat", None) or getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None)
+    if user is not None:
+        return user.id
+    return update.update_id
+
+
+def create_webhook_app(dp : Dispatcher, bot : Bot, pool : UpdateWorkerPool) -> web.Application:
+    async def handle_update(request : web.Request) -> web.Response:
+        if WEBHOOK_SECRET and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != WEBHOOK_SECRET:
+            return web.Response(status=401)
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": bot})
+        except (ValueError, ValidationError) as e:
+            logger.warning(f"Invalid update: {e}")
+            return web.Response(status=400)
+        # Ответ уходит, как только апдейт принят в очередь, а не после обработки
+        await pool.submit(get_chat_key(update), update)
+        return web.Response()
+
+    async def get_stats(request : web.Request) -> web.Response:
+        return web.json_response(pool.get_stats())
+
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, handle_update)
+    app.router.add_get(f"{WEBHOOK_PATH}/stats", get_stats)
+    return app
+
+
+async def run_webhook(dp : Dispatcher, bot : Bot):
+    pool = UpdateWorkerPool(lambda update: dp.feed_update(bot, update), WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE)
+    pool.start()
+    runner = web.AppRunner(create_webhook_app(dp, bot, pool))
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+    logger.info(f"Webhook server listening on {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+
+    if WEBHOOK_URL:
+        await bot.set_webhook(
+            f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET or None,
+            allowed_updates=dp.resolve_used_update_types()
+        )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await pool.stop()
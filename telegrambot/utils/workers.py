@@ -0,0 +1,51 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from loguru import logger
+
+
+class UpdateWorkerPool():
+    """
+    Параллельная обработка апдейтов фиксированным числом воркеров. Апдейты
+    с одним ключом (чатом) всегда попадают к одному воркеру и обрабатываются
+    по порядку, разные чаты обрабатываются параллельно. Очереди воркеров
+    ограничены: если воркер не успевает, submit ждет свободного места.
+    """
+    def __init__(self, handle : Callable[[Any], Awaitable[Any]], workers : int, queue_size : int):
+        self.handle = handle
+        self.queues = [asyncio.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.processed = 0
+        self.failed = 0
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._work(queue)) for queue in self.queues]
+
+    async def stop(self):
+        # None в конце очереди: воркер дообрабатывает принятые апдейты и завершается
+        for queue in self.queues:
+            await queue.put(None)
+        await asyncio.gather(*self._tasks)
+        self._tasks = []
+
+    async def submit(self, key : int, update : Any):
+        await self.queues[hash(key) % len(self.queues)].put(update)
+
+    async def _work(self, queue : asyncio.Queue):
+        while True:
+            update = await queue.get()
+            if update is None:
+                return
+            try:
+                await self.handle(update)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Update processing failed: {e}")
+
+    def get_stats(self) -> dict:
+        return {
+            "queued": sum(queue.qsize() for queue in self.queues),
+            "processed": self.processed,
+            "failed": self.failed,
+        }